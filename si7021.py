@@ -8,6 +8,8 @@ Class utilize PiGPIO library ( http://abyz.co.uk/rpi/pigpio/ ) so it must be ins
 Follow pigpio home page Download instruction to get it up and running ( http://abyz.co.uk/rpi/pigpio/download.html ).
 pigpio was used because sensor Si7021 don't follow strictly SMBus spec for all commands, 
 the pigpio provided good solution for dealing with i2c frames construction of si7021.
+Bus access goes through transport object (see si7021_bus.py), pigpio is the default one,
+direct /dev/i2c-N (I2cDevBus) and in-memory (MemoryBus) can be used too.
 
 Check the code of si7021_test.py for reference.
 
@@ -25,7 +27,9 @@ License:
 """
 
 import time
-import pigpio
+import contextlib
+from si7021_conv import rh_centi, temp_centi
+from si7021_bus import Si7021BusError, PigpioBus
 
 def byte_array_to_string(ar):
 	s = ""
@@ -33,31 +37,358 @@ def byte_array_to_string(ar):
 		s += "{:02X} ".format(a)
 	return s
 
+def _crc8_table():
+	# CRC-8 of every single byte for polynomial 0x31 (x^8+x^5+x^4+1), MSB first
+	tbl = bytearray(256)
+	for b in range(256):
+		crc = b
+		for k in range(8):
+			if (crc & 0x80):
+				crc = ((crc<<1) ^ 0x31) & 0xFF
+			else:
+				crc = (crc<<1) & 0xFF
+		tbl[b] = crc
+	return bytes(tbl)
+
+CRC8_TABLE = _crc8_table()
+
+def crc8_update(b, crc):
+	"""CRC-8 update with one byte 'b' (table driven version of bitwise loop).
+	
+	Args:
+		b: byte to compute crc from
+		crc: byte with alredy computed crc that will be updated (or crc seed)
+	
+	Returns:
+		Byte - crc value updated with 'b' byte
+	"""
+	return CRC8_TABLE[(crc ^ b) & 0xFF]
+
+def crc8(data, crc=0x00):
+	"""CRC-8 of all bytes in 'data' (seed 'crc').
+	
+	Args:
+		data: bytes/bytearray/list of ints
+		crc: crc seed
+	
+	Returns:
+		Byte - crc value
+	"""
+	tbl = CRC8_TABLE
+	for b in data:
+		crc = tbl[crc ^ b]
+	return crc
+
+def crc8_check(buf, width=2):
+	"""Check CRC of all records in buffer, each record is 'width' data bytes followed by CRC byte
+	(like measurement results: MSB, LSB, CRC).
+	
+	Args:
+		buf: bytes/bytearray/memoryview with records
+		width(int): data bytes in record
+	
+	Returns:
+		list[int] - indexes of records with CRC mismatch (empty list if all OK)
+	"""
+	tbl = CRC8_TABLE
+	step = width + 1
+	bad = []
+	for r in range(len(buf) // step):
+		i = r * step
+		crc = 0x00
+		for b in buf[i:i+width]:
+			crc = tbl[crc ^ b]
+		if (crc != buf[i+width]):
+			bad.append(r)
+	return bad
+
+
+class Si7021CrcError(Exception):
+	"""Measurement result CRC mismatch (raised only with SI7021_CRC_RAISE policy)."""
+	pass
+
+
+class Si7021TimeoutError(Si7021BusError):
+	"""Measurement could not be done within given timeout."""
+	pass
+
+
+class _Si7021Result:
+	"""Base of slotted results - read-only dict compatibility: r['humi'], r.get(), dict(r),
+	'humi' in r, comparison with dict and as_dict() giving the old dict format.
+	"""
+	__slots__ = ()
+	_fields = ()
+	
+	def __getitem__(self, key):
+		if key in self._fields:
+			return getattr(self, key)
+		raise KeyError(key)
+	
+	def get(self, key, default=None):
+		if key in self._fields:
+			return getattr(self, key)
+		return default
+	
+	def keys(self):
+		return self._fields
+	
+	def __iter__(self):
+		return iter(self._fields)
+	
+	def __contains__(self, key):
+		return key in self._fields
+	
+	def __len__(self):
+		return len(self._fields)
+	
+	def __eq__(self, other):
+		if isinstance(other, _Si7021Result):
+			other = other.as_dict()
+		if isinstance(other, dict):
+			return self.as_dict() == other
+		return NotImplemented
+	
+	def as_dict(self):
+		"""Return result as dict (format of older versions)."""
+		return dict((f, getattr(self, f)) for f in self._fields)
+	
+	def __repr__(self):
+		return "{0}({1})".format(type(self).__name__, ", ".join("{0}={1!r}".format(f, getattr(self, f)) for f in self._fields))
+
+
+class Si7021HumiTemp(_Si7021Result):
+	"""Result of MeasHumiTemp / FetchHumiTemp: humi (0.01%), temp (0.01degC)."""
+	__slots__ = ('humi', 'temp')
+	_fields = __slots__
+	
+	def __init__(self, humi, temp):
+		self.humi = humi
+		self.temp = temp
+
+
+class Si7021Settings(_Si7021Result):
+	"""Result of ReadSettings (fields see there), strings and heater current are computed on access."""
+	__slots__ = ('user', 'heater', 'res', 'vdds', 'htre', 'rh_res', 'temp_res')
+	_fields = ('user', 'heater', 'res', 'vdds', 'vdds_str', 'htre', 'htre_str', 'heater_curr', 'rh_res', 'temp_res')
+	
+	def __init__(self, user, heater, res, vdds, htre, rh_res, temp_res):
+		self.user = user
+		self.heater = heater
+		self.res = res
+		self.vdds = vdds
+		self.htre = htre
+		self.rh_res = rh_res
+		self.temp_res = temp_res
+	
+	@property
+	def vdds_str(self):
+		return "OK" if self.vdds == 0 else "Low"
+	
+	@property
+	def htre_str(self):
+		return "On" if self.htre == 1 else "Off"
+	
+	@property
+	def heater_curr(self):
+		# heater current in 0.01mA
+		return (-299)+((self.heater+1)*608)
+
+
+class Si7021Ident(_Si7021Result):
+	"""Result of ReadSN (fields see there), strings are computed on access."""
+	__slots__ = ('ok', 'sn', 'device', 'fw')
+	_fields = ('ok', 'sn', 'device', 'device_str', 'fw', 'fw_str')
+	DEVICE_NAMES = { 0x00: "Samples", 0xff: "Samples", 0x0d: "Si7013", 0x14: "Si7020", 0x15: "Si7021" }
+	FW_NAMES = { 0xFF: "1.0", 0x20: "2.0" }
+	
+	def __init__(self, ok, sn, device, fw):
+		self.ok = ok
+		self.sn = sn
+		self.device = device
+		self.fw = fw
+	
+	@property
+	def device_str(self):
+		if (self.ok == 3):
+			return "err_len_resp"
+		if (self.ok == 255):
+			return "error"
+		return self.DEVICE_NAMES.get(self.device, "Unknown_Si70_{0}".format(self.device))
+	
+	@property
+	def fw_str(self):
+		if (self.ok == 3):
+			return "Err"
+		if (self.ok == 255):
+			return "err"
+		return self.FW_NAMES.get(self.fw, "Unknown_{:#02X}".format(self.fw))
+
+
+class Si7021Reading:
+	"""Result of Si7021.MeasWithin() .
+	
+	Attributes:
+		value: measured value (same as returned by measurement method), None if state is FAILED
+		state(int): SI7021_READING_FRESH, _RETRIED (fresh, but needed retries), _STALE (last good
+			value, measurement failed) or _FAILED (measurement failed and no older value)
+		ts(float): time.time() of value (None if FAILED)
+		retries(int): retries done by the measurement
+		error: exception of failed measurement (None if value is fresh)
+	"""
+	__slots__ = ('value', 'state', 'ts', 'retries', 'error')
+	
+	def __init__(self, value, state, ts, retries=0, error=None):
+		self.value = value
+		self.state = state
+		self.ts = ts
+		self.retries = retries
+		self.error = error
+	
+	def __repr__(self):
+		return "Si7021Reading(value={0!r}, state={1}, ts={2}, retries={3}, error={4!r})".format(self.value, self.state, self.ts, self.retries, self.error)
+
 
 class Si7021:
-	def __init__(self, _piBus, _siAddr=0x40, _readMode=0):
+	def __init__(self, _piBus, _siAddr=0x40, _readMode=0, _keepOpen=False, _waitMode=0, _transport=None):
 		"""Initialize Si7021 interface class.
 		
 		Args:
 			_piBus: Raspberry Pi I2C bus number
 			_siAddr: Si7021 I2C address (0x40 default)
-			_readMode: Measurement RH/Temp exec & read mode (only SI7021_READ_MODE_NO_HOLD supported)
+			_readMode: Measurement RH/Temp exec & read mode (SI7021_READ_MODE_NO_HOLD or SI7021_READ_MODE_HOLD)
+			_keepOpen: Keep one I2C handle open and share it between all calls (see Open/Close)
+			_waitMode: How to wait for conversion end (SI7021_WAIT_TABLE or SI7021_WAIT_POLL)
+			_transport: bus transport from si7021_bus (PigpioBus for this bus/address if omitted)
 		
 		Returns:
 			none
 		"""
 		self.piBus = int(_piBus)
 		self.siAddr = int(_siAddr)
-		self.pio = pigpio.pi()
+		if _transport is None:
+			_transport = PigpioBus(self.piBus, self.siAddr)
+		self.i2c = _transport
 		self.ReadMode = int(_readMode)
+		# HOLD MASTER mode: max. time of one read [s] (None = 2x conversion time), failures in row,
+		# True after falling back to NO HOLD mode (see _measureHold)
+		self.HoldTimeout = None
+		self.holdFails = 0
+		self.HoldFallback = False
+		# retries done by last measurement (bus errors, CRC), last good values of MeasWithin
+		self.LastRetries = 0
+		self.lastGood = {}
+		# expected time of one bus transaction [s], learned from measure command writes
+		self.xferTime = self.SI7021_XFER_TIME
+		self.KeepOpen = bool(_keepOpen)
+		self.dev = None
+		self.WaitMode = int(_waitMode)
+		self.ConvMargin = 1.1
 		self.HumiRes = 12
 		self.TempRes = 14
 		self.HeaterOn = 0
 		self.HeaterVal = 0
+		self.LastCrcOk = True
+		self.CrcPolicy = self.SI7021_CRC_RETRY
+		self.CrcRetries = 2
+		self.CrcErrors = 0
+		# write-through cache of user & heater registers (used only if RegCache is True)
+		self.RegCache = False
+		self.userReg = None
+		self.heaterReg = None
+		# device identity cache (si7021_ident.IdentityCache), see ReadSN
+		self.IdCache = None
+		# raw capture sink - object with write(ts, rh_code, temp_code, status), see MeasRaw
+		self.RawSink = None
+		# instrumentation (si7021_instr.Si7021Instruments), set by its Attach()
+		self.Instr = None
+		# read RH result (MSB, LSB, CRC), then write 0xE0 and read temperature (MSB, LSB)
+		self.zipHumiTemp = ( ('r', 3), ('w', bytes((self.SI7021_CMD_READ_TEMP_LAST_HUMI,))), ('r', 2) )
+		# on-daemon sampling script state (see ScriptStart)
+		self.scriptId = None
+		self.scriptSeq = 0
+		self.scriptDev = None
+	
 	
+	@property
+	def pio(self):
+		# pigpio connection (connected on first use) for on-daemon script, None for other transports
+		connect = getattr(self.i2c, 'connect', None)
+		if connect is None:
+			return None
+		return connect()
 	
 	def __del__(self):
-		self.pio.stop()		
+		if getattr(self, 'i2c', None) is not None:
+			self.Close()
+	
+	def __enter__(self):
+		self.Open()
+		return self
+	
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.Close()
+		return False
+	
+	def Open(self):
+		"""Switch to keep-open mode and open long-lived I2C handle.
+		Handle is shared by all methods until Close(), after bus error it is
+		dropped and opened again on next call.
+		
+		Args:
+		
+		Returns:
+			
+		"""
+		self.KeepOpen = True
+		if self.dev is None:
+			self.dev = self.i2c.open()
+		return
+	
+	def Close(self):
+		"""Release long-lived I2C handle (if any) and transport (reference to shared pigpio daemon connection).
+		
+		Args:
+		
+		Returns:
+			
+		"""
+		if self.scriptId is not None:
+			self.ScriptStop()
+		if self.dev is not None:
+			self._release(self.dev)
+		self.KeepOpen = False
+		self.i2c.stop()
+		return
+	
+	def _release(self, dev):
+		# forget & close handle, errors are ignored because handle might be already dead
+		if self.dev == dev:
+			self.dev = None
+		try:
+			self.i2c.close(dev)
+		except Si7021BusError:
+			pass
+	
+	@contextlib.contextmanager
+	def _bus(self):
+		"""Provide I2C handle for one call.
+		In keep-open mode the long-lived handle is used (opened when missing),
+		otherwise handle is opened here and closed on exit.
+		Handle is always dropped when exception occurs inside block.
+		"""
+		dev = self.dev
+		if dev is None:
+			dev = self.i2c.open()
+			if self.KeepOpen:
+				self.dev = dev
+		err = True
+		try:
+			yield dev
+			err = False
+		finally:
+			if err or self.dev != dev:
+				self._release(dev)
 
 	# Constans - Si7021 default I2C address
 	SI7021_DEF_ADDR=0x40
@@ -78,13 +409,83 @@ class Si7021:
 	SI7021_CMD_READ_EID2_2=0xC9
 	SI7021_CMD_READ_FW_1=0x84
 	SI7021_CMD_READ_FW_2=0xB8
+	# read user & heater register in one transfer (ApplyConfig)
+	SI7021_ZIP_READ_REGS = ( ('w', bytes((SI7021_CMD_READ_USER,))), ('r', 1), ('w', bytes((SI7021_CMD_READ_HEATER,))), ('r', 1) )
 	# Constans - Si7021 class ReadMode
 	SI7021_READ_MODE_NO_HOLD=0
+	SI7021_READ_MODE_HOLD=1 # chip stretch SCL until conversion is done (bus must support it)
+	# Constans - HOLD MASTER failures in row before ReadMode falls back to NO HOLD
+	SI7021_HOLD_MAX_FAILS=3
+	# Constans - NO HOLD command -> HOLD command
+	SI7021_HOLD_CMD = { 0xF5: 0xE5, 0xF3: 0xE3 }
+	# Constans - Si7021 class WaitMode
+	SI7021_WAIT_TABLE=0 # sleep for max. conversion time of current resolution
+	SI7021_WAIT_POLL=1 # sleep for part of it, then retry read until chip ACK it
+	# Constans - measurement CRC mismatch policy (self.CrcPolicy)
+	SI7021_CRC_IGNORE=0 # don't retry, only self.LastCrcOk is set
+	SI7021_CRC_RETRY=1 # repeat measurement up to self.CrcRetries times, then return last result
+	SI7021_CRC_RAISE=2 # like SI7021_CRC_RETRY but raise Si7021CrcError at the end
+	# Constans - MeasWithin() measurements
+	SI7021_MEAS_HUMI=0
+	SI7021_MEAS_TEMP=1
+	SI7021_MEAS_HUMI_TEMP=2
+	SI7021_MEAS_HUMI_TEMP_RAW=3
+	# Constans - Si7021Reading state
+	SI7021_READING_FRESH=0
+	SI7021_READING_RETRIED=1
+	SI7021_READING_STALE=2
+	SI7021_READING_FAILED=3
+	# Constans - raw sample status (MeasRaw)
+	SI7021_STATUS_OK=0
+	SI7021_STATUS_CRC_ERR=1
+	SI7021_STATUS_BUS_ERR=2
+	SI7021_STATUS_NO_DATA=3 # no measurement done yet (e.g. initial si7021_collector slot)
+	# Constans - RES[1:0] bits value -> (RH resolution, Temp resolution) in bits
+	SI7021_RES_BITS = { 0x00: (12, 14), 0x01: (8, 12), 0x02: (10, 13), 0x03: (11, 11) }
+	# Constans - max. conversion time [s] for resolution [bits] (datasheet Table 2)
+	SI7021_CONV_TIME_HUMI = { 12: 0.012, 11: 0.007, 10: 0.0045, 8: 0.0031 }
+	SI7021_CONV_TIME_TEMP = { 14: 0.0108, 13: 0.0062, 12: 0.0038, 11: 0.0024 }
+	# Constans - poll mode back-off between read retries [s]
+	SI7021_POLL_BACKOFF_MIN = 0.0005
+	SI7021_POLL_BACKOFF_MAX = 0.002
+	# initial estimate of one bus transaction time [s] (timeout budget, see _timeLeft)
+	SI7021_XFER_TIME = 0.0005
+	# max. share of timeout reserved for expected bus transactions
+	SI7021_XFER_BUDGET = 0.25
+	# Constans - on-daemon sampling script (pigpio script language), see ScriptStart.
+	# Scripts can't read bytes blocks, so RH is read with I2CRW on HOLD MASTER command (0xE5)
+	# and temp. of that measurement with I2CRW on 0xE0 (words come LSB first - SMBus order).
+	# Params at start: p0=bus, p1=address, p2=pause between samples [ms], p9=0
+	# Params while running (valid only after script set p9 to 1):
+	#   p0 - sequence, odd while ring is updated, +2 per sample
+	#   p1,p2 / p3,p4 / p5,p6 - ring of last 3 samples (rh word, temp word), newest first
+	#   p7 - read errors count
+	#   p8 - I2C handle opened by script
+	#   p9 - 1 when handle is opened and p0..p7 are cleared (ready marker)
+	SI7021_SCRIPT_RING = 3
+	# max. time [s] to wait for script to get ready (see ScriptStart)
+	SI7021_SCRIPT_START_TIMEOUT = 1.0
+	SI7021_SCRIPT = (
+		"LD v0 p0 LD v1 p1 LD v2 p2 "
+		"I2CO v0 v1 0 STA v3 STA p8 "
+		"LD p0 0 LD p1 0 LD p2 0 LD p3 0 LD p4 0 LD p5 0 LD p6 0 LD p7 0 "
+		"LD p9 1 "
+		"TAG 1 "
+		"I2CRW v3 229 JM 2 STA v4 "
+		"I2CRW v3 224 JM 2 STA v5 "
+		"INR p0 "
+		"LD p5 p3 LD p6 p4 LD p3 p1 LD p4 p2 LD p1 v4 LD p2 v5 "
+		"INR p0 "
+		"MILS v2 JMP 1 "
+		"TAG 2 "
+		"INR p7 MILS v2 JMP 1"
+		)
 	
 	def crc8_update(self, b, crc):
 		"""CRC-8 calculation for polynomial x^8+x^5+x^4+1
 		Polynomial is identical to Dallas/Maxim 1-Wire
 		Working code thanks to hippy from raspberrypi.org forum
+		(kept for compatibility, same as module crc8_update)
 		
 		Args:
 			b: byte to compute crc from
@@ -93,25 +494,20 @@ class Si7021:
 		Returns:
 			Byte - crc value updated with 'b' byte
 		"""
-		for k in range(8):
-			if ( ((b^crc) & 0x80) == 0x80 ):
-				crc = crc<<1
-				crc = crc^0x31
-			else:
-				crc = crc<<1
-			b = b << 1
-		crc = crc & 0xFF
-		return crc
+		return crc8_update(b, crc)
 	
-	def ReadSN(self):
+	def ReadSN(self, cached=False):
 		"""Read Si70xx serial number & firmware version and check CRC at the same time.
 		Tested only on Si7021, so I don't know if other chips will follow data layout.
+		With self.IdCache set, successful result is stored in it and cached=True
+		returns stored value (if not expired) without touching the bus.
 
 		Args:
+			cached(bool): use self.IdCache entry if available
 
 
 		Returns:
-			dict with fields:
+			Si7021Ident (dict compatible, see as_dict()) with fields:
 				ok(int): 
 					0=No errors, 
 					1 or 2=Errors occured (CRC mismatch in 1=data1 or 2=data2), 
@@ -122,13 +518,29 @@ class Si7021:
 				device_str(string): string with full device name
 				fw_str(string): firmware version in string
 		"""
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		# self.ReadMode == SI7021_READ_MODE_NO_HOLD
-		(cnt1, dta1) = self.pio.i2c_zip(dev, [2, 4, self.siAddr, 7, 2, self.SI7021_CMD_READ_EID1_1, self.SI7021_CMD_READ_EID1_2, 6, 8, 0])
-		
-		(cnt2, dta2) = self.pio.i2c_zip(dev, [2, 4, self.siAddr, 7, 2, self.SI7021_CMD_READ_EID2_1, self.SI7021_CMD_READ_EID2_2, 6, 6, 0])
-		(cnt3, dta3) = self.pio.i2c_zip(dev, [2, 4, self.siAddr, 7, 2, self.SI7021_CMD_READ_FW_1,   self.SI7021_CMD_READ_FW_2, 6, 1, 0])
-		self.pio.i2c_close(dev)
+		if (cached and self.IdCache is not None):
+			re = self.IdCache.Get(self.piBus, self.siAddr)
+			if re is not None:
+				return Si7021Ident(re['ok'], re['sn'], re['device'], re['fw'])
+		re = self._readSN()
+		if self.IdCache is not None:
+			if (re['ok'] == 0):
+				self.IdCache.Put(self.piBus, self.siAddr, re)
+			else:
+				self.IdCache.Invalidate(self.piBus, self.siAddr)
+		if (self.Instr is not None and re['ok'] in (1, 2)):
+			self.Instr.count('crc_error')
+		return re
+	
+	def _readSN(self):
+		# ReadSN without cache
+		with self._bus() as dev:
+			# self.ReadMode == SI7021_READ_MODE_NO_HOLD
+			dta1 = self.i2c.transfer(dev, (('w', bytes((self.SI7021_CMD_READ_EID1_1, self.SI7021_CMD_READ_EID1_2))), ('r', 8)), True)
+			
+			dta2 = self.i2c.transfer(dev, (('w', bytes((self.SI7021_CMD_READ_EID2_1, self.SI7021_CMD_READ_EID2_2))), ('r', 6)), True)
+			dta3 = self.i2c.transfer(dev, (('w', bytes((self.SI7021_CMD_READ_FW_1,   self.SI7021_CMD_READ_FW_2))), ('r', 1)), True)
+		(cnt1, cnt2, cnt3) = (len(dta1), len(dta2), len(dta3))
 		#print("SN:0:Count={0} RetData={1}".format(cnt1,byte_array_to_string(dta1)))
 		#print("SN:1:Count={0} RetData={1}".format(cnt2,byte_array_to_string(dta2)))
 		#print("FW:0:Count={0} RetData={1}".format(cnt3,byte_array_to_string(dta3)))
@@ -158,33 +570,8 @@ class Si7021:
 					ok=2
 					#print("  Data2[{0},{1}]=0x{2:02X},0x{3:02X} CRC_GOT=0x{4:02X} CRC_CALC={5:02X} MATCH={6}".format(i*3,(i*3)+1, b, c, bcrc, crc, (bcrc==crc)))
 			# 3rd data don't need nor have CRC so - nothing to do :)
-			# ------- now reassemble all important data into nice dict :)
-			# device name string
-			dn="Unknown_Si70_{0}".format(dta2[0])
-			if (dta2[0] == 0x00 or dta2[0] == 0xff):
-				dn="Samples"
-			elif (dta2[0] == 0x0d):
-				dn="Si7013"
-			elif (dta2[0] == 0x14):
-				dn="Si7020"
-			elif (dta2[0] == 0x15):
-				dn="Si7021"
-			# firmware version
-			fws="Unknown_{:#02X}".format(dta3[0])
-			if (dta3[0] == 0xFF):
-				fws="1.0"
-			elif (dta3[0] == 0x20):
-				fws="2.0"
-			# build return data
-			re = {
-				'ok': ok,
-				'sn': [ dta1[0], dta1[2], dta1[4], dta1[6], dta2[0], dta2[1], dta2[3], dta2[4] ],
-				'device': dta2[0],
-				'device_str': dn,
-				'fw': dta3[0],
-				'fw_str': fws
-				}
-			return re
+			# ------- now reassemble all important data (device name & firmware strings are in Si7021Ident)
+			return Si7021Ident(ok, [ dta1[0], dta1[2], dta1[4], dta1[6], dta2[0], dta2[1], dta2[3], dta2[4] ], dta2[0], dta3[0])
 		else:
 			# lengths mismatch
 			#print("Expected 8, 6 and 1  bytes, but got: {0} {1} {2}".format(cnt1, cnt2, cnt3))
@@ -203,19 +590,11 @@ class Si7021:
 			#	for i in range(cnt3):
 			#		print("{:02X} ".format(dta1[i]), end=' ')
 			#	print(" ")
-			re = {
-				'ok': 3,
-				'sn': [ cnt1, cnt2, cnt3, 0xff, 0xff, 0xff, 0xff, 0xff ],
-				'device': 0xff,
-				'device_str': "err_len_resp",
-				'fw': 0x00,
-				'fw_str': "Err"
-				}
-			return re
+			return Si7021Ident(3, [ cnt1, cnt2, cnt3, 0xff, 0xff, 0xff, 0xff, 0xff ], 0xff, 0x00)
 
 		# --------------
 		# end func. - this return should never occur
-		return { 'ok':255, 'sn': ([0xff]*8), 'device': 0xff, 'device_str': 'error', 'fw': 0x00, 'fw_str': 'err' }
+		return Si7021Ident(255, ([0xff]*8), 0xff, 0x00)
 
 	def Reset(self):
 		"""Perform software reset to Si7021
@@ -225,20 +604,37 @@ class Si7021:
 		Returns:
 			
 		"""
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		self.pio.i2c_write_byte(dev, self.SI7021_CMD_RESET); # CMD reset
-		self.pio.i2c_close(dev)
+		with self._bus() as dev:
+			self.i2c.write_byte(dev, self.SI7021_CMD_RESET); # CMD reset
 		time.sleep(0.1) # wait 100ms (min 15ms)
+		# registers are back at reset values
+		(self.HumiRes, self.TempRes) = self.SI7021_RES_BITS[0x00]
+		self.HeaterOn = 0
+		self.HeaterVal = 0
+		self.InvalidateRegs()
+		return
+	
+	def InvalidateRegs(self):
+		"""Forget cached user & heater register values (next access reads chip).
+		
+		Args:
+		
+		Returns:
+			
+		"""
+		self.userReg = None
+		self.heaterReg = None
 		return
 	
-	def ReadSettings(self):
+	def ReadSettings(self, cached=False):
 		"""Read Si7021 settings and pack them into nice dict :)
 		
 		Args:
-			none
+			cached(bool): decode settings from register cache without touching the bus
+				(only if self.RegCache is True and both registers are cached, otherwise chip is read)
 		
 		Returns:
-			dict with fields:
+			Si7021Settings (dict compatible, see as_dict()) with fields:
 				user(int): RAW value of User register
 				heater(int): RAW value of Heater register
 				res(int): RES[1:0] bits
@@ -250,61 +646,34 @@ class Si7021:
 				rh_res(int): Humidity measurement resolution (bits)
 				temp_res(int): Temperature measurement resolution (bits)
 		"""
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		ur = self.pio.i2c_read_byte_data(dev, self.SI7021_CMD_READ_USER) #Read User Register
-		ht = self.pio.i2c_read_byte_data(dev, self.SI7021_CMD_READ_HEATER) #Read heater register
-		self.pio.i2c_close(dev)
+		if (cached and self.userReg is not None and self.heaterReg is not None):
+			ur = self.userReg
+			ht = self.heaterReg
+		else:
+			with self._bus() as dev:
+				ur = self.i2c.read_byte_data(dev, self.SI7021_CMD_READ_USER) #Read User Register
+				ht = self.i2c.read_byte_data(dev, self.SI7021_CMD_READ_HEATER) #Read heater register
+			if self.RegCache:
+				self.userReg = ur
+				self.heaterReg = ht
 		#print("   User Register: 0x{0:02X} ({0:#010b})".format(ur))
 		#print("   Heater register 0x{0:02X} ({0:#010b})".format(ht))
 		# sampling resolution (Meas. res.)
 		sr = ((ur&0x80)>>6) | (ur&0x01)
-		rrh=12 # res. humi
-		rtp=14 # res. temp
-		if (sr == 0x00):
-			rrh=12
-			rtp=14
-		elif (sr == 0x01):
-			rrh=8
-			rtp=12
-		elif (sr == 0x02):
-			rrh=10
-			rtp=13
-		elif (sr == 0x03):
-			rrh=11
-			rtp=11
+		(rrh, rtp) = self.SI7021_RES_BITS[sr] # res. humi & temp
 		# vdd status
 		vdds = (ur&40)>>6
 		# heater on
 		htre = (ur&0x04)>>2
 		# heater value
 		ht = ht&0x0f
-		# heater current in 0.01mA
-		htc = (-299)+((ht+1)*608)
-		# vdd status string
-		vddstr="Low"
-		if (vdds == 0): vddstr="OK"
-		# heater status string
-		htrestr="Off"
-		if (htre == 1): htrestr="On"
 		# update class var.
 		self.HumiRes = rrh
 		self.TempRes = rtp
 		self.HeaterOn = htre
 		self.HeaterVal = ht
-		# return dict
-		re = {
-			'user': ur,
-			'heater': ht,
-			'res': sr,
-			'vdds': vdds,
-			'vdds_str': vddstr,
-			'htre': htre,
-			'htre_str': htrestr,
-			'heater_curr': htc,
-			'rh_res': rrh,
-			'temp_res': rtp
-		}
-		return re	
+		# status strings & heater current are computed by Si7021Settings when accessed
+		return Si7021Settings(ur, ht, sr, vdds, htre, rrh, rtp)
 	
 	
 	def SetHeater(self, htrval):
@@ -317,16 +686,20 @@ class Si7021:
 			True if register value match after write, false if not.
 		"""
 		htrval = htrval & 0x0F
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		self.pio.i2c_write_byte_data(dev, self.SI7021_CMD_WRITE_HEATER, htrval) #Write heater value
-		time.sleep(0.01)
-		# read back and check if match written value)
-		ht = self.pio.i2c_read_byte_data(dev, self.SI7021_CMD_READ_HEATER) #Read heater register
-		self.pio.i2c_close(dev)
+		with self._bus() as dev:
+			self.i2c.write_byte_data(dev, self.SI7021_CMD_WRITE_HEATER, htrval) #Write heater value
+			time.sleep(0.01)
+			# read back and check if match written value)
+			ht = self.i2c.read_byte_data(dev, self.SI7021_CMD_READ_HEATER) #Read heater register
 		if (htrval==ht):
 			self.HeaterVal=htrval
+			if self.RegCache:
+				self.heaterReg=ht
 		else:
 			self.HeaterVal=ht&0x0F
+			self.InvalidateRegs()
+			if self.Instr is not None:
+				self.Instr.count('verify_fail')
 
 		return (htrval==ht)
 
@@ -347,6 +720,7 @@ class Si7021:
 
 	def SetSampling(self, val):
 		"""Set measurement resolution (RES[1:0] bits)
+		With self.RegCache the user register is not read before write if it is cached.
 		
 		Args:
 			val (int): RES[1:0] bits value (0x00..0x03 ; val[0]=RES0 , val[1]=RES1)
@@ -355,92 +729,457 @@ class Si7021:
 			True if RESx bit set OK, otherwise false.
 		"""
 		val = val & 0x03
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		ur = self.pio.i2c_read_byte_data(dev, self.SI7021_CMD_READ_USER) #Read User Register
-		# mask RES[1:0] bits
-		ur &= 0x7e
-		# set new bits values - the hard way :D
-		ur |= ((val&0x02)<<6) | (val&0x01)
-		# easier way is to use if's for val bits, then in-if set matching bits in ur
-		self.pio.i2c_write_byte_data(dev, self.SI7021_CMD_WRITE_USER, ur) #Write user value back with moddified bits
-		time.sleep(0.01) # wait a moment
-		# read back ur and check if match
-		ur2 = self.pio.i2c_read_byte_data(dev, self.SI7021_CMD_READ_USER) #Read User Register
-		self.pio.i2c_close(dev)
+		with self._bus() as dev:
+			ur = self.userReg
+			if ur is None:
+				ur = self.i2c.read_byte_data(dev, self.SI7021_CMD_READ_USER) #Read User Register
+			# mask RES[1:0] bits
+			ur &= 0x7e
+			# set new bits values - the hard way :D
+			ur |= ((val&0x02)<<6) | (val&0x01)
+			# easier way is to use if's for val bits, then in-if set matching bits in ur
+			self.i2c.write_byte_data(dev, self.SI7021_CMD_WRITE_USER, ur) #Write user value back with moddified bits
+			time.sleep(0.01) # wait a moment
+			# read back ur and check if match
+			ur2 = self.i2c.read_byte_data(dev, self.SI7021_CMD_READ_USER) #Read User Register
 		if (ur==ur2):
 			# update class vars
-			rrh=12
-			rtp=14
-			sr=val
-			if (sr == 0x00):
-				rrh=12
-				rtp=14
-			elif (sr == 0x01):
-				rrh=8
-				rtp=12
-			elif (sr == 0x02):
-				rrh=10
-				rtp=13
-			elif (sr == 0x03):
-				rrh=11
-				rtp=11
-			self.HumiRes=rrh
-			self.TempRes=rtp
+			(self.HumiRes, self.TempRes) = self.SI7021_RES_BITS[val]
+			if self.RegCache:
+				self.userReg = ur2
+		else:
+			self.InvalidateRegs()
+			if self.Instr is not None:
+				self.Instr.count('verify_fail')
 		return (ur==ur2)
 	
+	def ApplyConfig(self, resolution=None, heater_enable=None, heater_level=None):
+		"""Set measurement resolution and heater at once, with minimal bus traffic.
+		Target user & heater register values are computed from current ones (register
+		cache with self.RegCache, otherwise both are read by one transfer); registers
+		which already match are not written at all, the rest is written and read back
+		for verification by one transfer (register write takes effect immediately, so
+		no wait is needed between them).
+		
+		Args:
+			resolution(int): RES[1:0] bits value (0x00..0x03, see SetSampling), None = keep
+			heater_enable(bool): HTRE bit, None = keep
+			heater_level(int): heater register value (0..15, see SetHeater), None = keep
+		
+		Returns:
+			True if chip registers match requested config (also when nothing was written), otherwise false.
+		"""
+		with self._bus() as dev:
+			ur = self.userReg
+			ht = self.heaterReg
+			if (ur is None or ht is None):
+				dta = self.i2c.transfer(dev, self.SI7021_ZIP_READ_REGS, True)
+				if (len(dta) < 2):
+					raise Si7021BusError("short read ({0} of 2 bytes)".format(len(dta)))
+				(ur, ht) = (dta[0], dta[1] & 0x0F)
+			ur0 = ur
+			ht0 = ht
+			if resolution is not None:
+				resolution &= 0x03
+				ur = (ur & 0x7e) | ((resolution&0x02)<<6) | (resolution&0x01)
+			if heater_enable is not None:
+				ur = (ur & ~0x04) | (0x04 if heater_enable else 0x00)
+			if heater_level is not None:
+				ht = heater_level & 0x0F
+			msgs = ()
+			if (ur != ur0):
+				msgs += (('w', bytes((self.SI7021_CMD_WRITE_USER, ur))),)
+			if (ht != ht0):
+				msgs += (('w', bytes((self.SI7021_CMD_WRITE_HEATER, ht))),)
+			if msgs:
+				dta = self.i2c.transfer(dev, msgs + self.SI7021_ZIP_READ_REGS, True)
+				if (len(dta) < 2):
+					raise Si7021BusError("short read ({0} of 2 bytes)".format(len(dta)))
+		if msgs:
+			# only RES1, HTRE, RES0 bits of user register are writable
+			ok = (((dta[0] ^ ur) & 0x85) == 0 and (dta[1] & 0x0F) == ht)
+			(ur, ht) = (dta[0], dta[1] & 0x0F)
+		else:
+			ok = True
+		if ok:
+			if self.RegCache:
+				self.userReg = ur
+				self.heaterReg = ht
+		else:
+			self.InvalidateRegs()
+			if self.Instr is not None:
+				self.Instr.count('verify_fail')
+		# update class vars (from chip values)
+		(self.HumiRes, self.TempRes) = self.SI7021_RES_BITS[((ur&0x80)>>6) | (ur&0x01)]
+		self.HeaterOn = (ur&0x04)>>2
+		self.HeaterVal = ht
+		return ok
+	
+	
+	def ConvTime(self, humi=True):
+		"""Return time needed for conversion at current resolution (self.HumiRes/self.TempRes).
+		RH measurement always measure temperature too, so its time is sum of both.
+		
+		Args:
+			humi(bool): True for RH (+temp) measurement, False for temperature only
+		
+		Returns:
+			float: max. conversion time in seconds (with self.ConvMargin applied)
+		"""
+		t = self.SI7021_CONV_TIME_TEMP[self.TempRes]
+		if humi:
+			t += self.SI7021_CONV_TIME_HUMI[self.HumiRes]
+		return t * self.ConvMargin
+	
+	def _readResult(self, dev, n, humi, zip=None, deadline=None, reserve=0.0):
+		"""Wait for conversion end and read 'n' bytes of result (NO HOLD MASTER mode).
+		If 'zip' is given, it is executed as transfer() instead of plain read.
+		In SI7021_WAIT_POLL mode chip NACK read until conversion is done, so read is
+		retried with short back-off until it succeed or 2x conversion time (or 'deadline'
+		- time.monotonic() value, less 'reserve' [s] for result read) pass.
+		"""
+		t = self.ConvTime(humi)
+		last = None
+		if deadline is not None:
+			# result read must fit before deadline too
+			last = deadline - reserve
+		if (self.WaitMode != self.SI7021_WAIT_POLL):
+			if (last is not None and time.monotonic() + t > last):
+				raise Si7021TimeoutError("no time for conversion and result read")
+			time.sleep(t)
+			return self._read(dev, n, zip)
+		# typical conversion time is ~2/3 of max, don't bother chip before half
+		if (last is not None and time.monotonic() + (t * 0.5) > last):
+			raise Si7021TimeoutError("no time for conversion and result read")
+		time.sleep(t * 0.5)
+		end = time.monotonic() + (t * 1.5)
+		if last is not None:
+			end = min(end, last)
+		backoff = self.SI7021_POLL_BACKOFF_MIN
+		while True:
+			try:
+				return self._read(dev, n, zip)
+			except Si7021BusError:
+				now = time.monotonic()
+				if (now >= end):
+					raise
+				if self.Instr is not None:
+					self.Instr.count('retry')
+			time.sleep(min(backoff, end - now))
+			backoff = min(backoff*2, self.SI7021_POLL_BACKOFF_MAX)
+	
+	def _xferDone(self, t):
+		# update bus transaction time estimate with measured 't' [s] (decaying average,
+		# so one stalled transaction doesn't stick)
+		self.xferTime = ((self.xferTime * 3) + t) / 4
+	
+	def _busTime(self, k, busMax=None):
+		# expected time of 'k' bus transactions, capped to 'busMax' [s]
+		t = k * self.xferTime
+		if busMax is not None:
+			t = min(t, busMax)
+		return t
+	
+	def _timeLeft(self, deadline, humi, zip=None, busMax=None, first=False):
+		# True if one more NO HOLD measurement (conversion + expected bus time, capped to
+		# 'busMax') fits before deadline; 'first' try needs only conversion time to fit
+		if deadline is None:
+			return True
+		bus = 0.0
+		if not first:
+			# command write + result read (+ open & close of handle when not kept open)
+			n = 1 + (len(zip) if zip else 1)
+			if self.dev is None:
+				n += 2
+			bus = self._busTime(n, busMax)
+		return (deadline - time.monotonic()) >= self.ConvTime(humi) + bus
+	
+	def _measure(self, cmd, n, humi, zip=None, timeout=None):
+		"""Issue measure command 'cmd', wait and read result (see _readResult).
+		First 3 bytes of result are MSB, LSB, CRC - CRC is checked and measurement
+		repeated according to self.CrcPolicy .
+		With 'timeout' [s] failed measurement (bus error, short read) is repeated with
+		back-off too, but only while there is time for another conversion and expected
+		bus transactions, otherwise Si7021TimeoutError is raised (CRC retries end at that
+		point as well). No wait goes past the deadline, only single bus transaction
+		(e.g. clock stretched HOLD read) can. Expected bus time is capped to
+		SI7021_XFER_BUDGET share of timeout and the first try needs only conversion
+		time to fit, so too high estimate can't block measurements.
+		"""
+		tries = 0
+		crcTries = 0
+		self.LastRetries = 0
+		deadline = None
+		busMax = None
+		if timeout is not None:
+			deadline = time.monotonic() + timeout
+			busMax = timeout * self.SI7021_XFER_BUDGET
+		backoff = self.SI7021_POLL_BACKOFF_MIN
+		while True:
+			if not self._timeLeft(deadline, humi, zip, busMax, tries == 0):
+				raise Si7021TimeoutError("no time for measurement ({0} tries done)".format(tries))
+			try:
+				dta = None
+				if (self.ReadMode == self.SI7021_READ_MODE_HOLD):
+					dta = self._measureHold(cmd, n, humi, zip, deadline)
+					# failed HOLD try took one conversion time already
+					if (dta is None and not self._timeLeft(deadline, humi, zip, busMax)):
+						raise Si7021TimeoutError("no time for NO HOLD measurement after failed HOLD read ({0} tries done)".format(tries))
+				if dta is None:
+					with self._bus() as dev:
+						t = time.monotonic()
+						self.i2c.write_byte(dev, cmd)
+						self._xferDone(time.monotonic() - t)
+						reserve = 0.0 if tries == 0 else self._busTime(len(zip) if zip else 1, busMax)
+						dta = self._readResult(dev, n, humi, zip, deadline, reserve)
+			except Si7021TimeoutError:
+				raise
+			except Si7021BusError as e:
+				if deadline is None:
+					raise
+				tries += 1
+				self.LastRetries = tries
+				if not self._timeLeft(deadline - backoff, humi, zip, busMax):
+					raise Si7021TimeoutError("measurement failed within timeout ({0} tries): {1}".format(tries, e))
+				if self.Instr is not None:
+					self.Instr.count('retry')
+				time.sleep(backoff)
+				backoff = min(backoff*2, self.SI7021_POLL_BACKOFF_MAX)
+				continue
+			more = self._timeLeft(deadline, humi, zip, busMax)
+			if self._crcDone(dta, crcTries, more):
+				return dta
+			crcTries += 1
+			tries += 1
+			self.LastRetries = tries
+	
+	def _measureHold(self, cmd, n, humi, zip=None, deadline=None):
+		"""HOLD MASTER measurement - command, repeated start and result read in one combined
+		transfer, chip stretch clock until conversion is done, so read returns right after it.
+		Return result, or None when it failed (bus error, short or corrupted result, read took
+		longer than self.HoldTimeout) and measurement must be done in NO HOLD mode.
+		Only those failures count to SI7021_HOLD_MAX_FAILS - 'deadline' (time.monotonic() value
+		of measurement timeout) limits only the wait after failure, valid result is never dropped
+		because of it. After SI7021_HOLD_MAX_FAILS failures in row self.ReadMode falls back to NO HOLD
+		(self.HoldFallback is set), bus probably can't do clock stretching.
+		Hard limit of blocked read is bus adapter timeout (see I2cDevBus timeout).
+		Only the transfer itself is timed - opening the handle and waiting for bus lock of
+		transport (other sensors on the bus) don't count as failure.
+		"""
+		# zip starts with result read, the rest (read temp. of last RH) follows in the same transfer
+		msgs = (('w', bytes((self.SI7021_HOLD_CMD[cmd],))), ('r', 3)) + (tuple(zip[1:]) if zip else ())
+		timeout = self.HoldTimeout
+		if timeout is None:
+			timeout = self.ConvTime(humi) * 2
+		lock = getattr(self.i2c, 'lock', None)
+		if lock is None:
+			lock = contextlib.nullcontext()
+		t = None
+		try:
+			with self._bus() as dev:
+				with lock:
+					t = time.monotonic()
+					dta = self.i2c.transfer(dev, msgs, True)
+					xfer = time.monotonic() - t
+			tbl = CRC8_TABLE
+			ok = (len(dta) >= n and tbl[tbl[dta[0]] ^ dta[1]] == dta[2] and xfer <= timeout)
+		except Si7021BusError:
+			ok = False
+		if ok:
+			self.holdFails = 0
+			return dta
+		self.holdFails += 1
+		if self.Instr is not None:
+			self.Instr.count('hold_fail')
+		if (self.holdFails >= self.SI7021_HOLD_MAX_FAILS):
+			self.ReadMode = self.SI7021_READ_MODE_NO_HOLD
+			self.HoldFallback = True
+		# chip may be still converting - it would NACK next command (but don't wait past deadline);
+		# nothing was sent if handle couldn't be opened
+		rest = 0.0
+		if t is not None:
+			rest = self.ConvTime(humi) - (time.monotonic() - t)
+		if deadline is not None:
+			rest = min(rest, deadline - time.monotonic())
+		time.sleep(max(0.0, rest))
+		return None
 	
-	def MeasHumi(self):
+	def _crcDone(self, dta, tries, more=True):
+		"""Check CRC of result (dta[0..2] = MSB, LSB, CRC) and apply self.CrcPolicy .
+		Return True if result should be used, False if measurement should be repeated
+		('more' is False when there is no time for another try).
+		"""
+		tbl = CRC8_TABLE
+		self.LastCrcOk = (tbl[tbl[dta[0]] ^ dta[1]] == dta[2])
+		if self.LastCrcOk:
+			return True
+		# chip is maybe not what we think it is - don't trust cached registers
+		self.InvalidateRegs()
+		self.CrcErrors += 1
+		if self.Instr is not None:
+			self.Instr.count('crc_error')
+		if (self.CrcPolicy == self.SI7021_CRC_IGNORE):
+			return True
+		if (tries < self.CrcRetries and more):
+			if self.Instr is not None:
+				self.Instr.count('retry')
+			return False
+		if (self.CrcPolicy == self.SI7021_CRC_RAISE):
+			raise Si7021CrcError("CRC mismatch after {0} tries (got 0x{1:02X})".format(tries+1, dta[2]))
+		return True
+	
+	def _read(self, dev, n, zip=None):
+		# read 'n' bytes of result, or run 'zip' transfer when given
+		if zip is not None:
+			dta = self.i2c.transfer(dev, zip)
+		else:
+			dta = self.i2c.read_device(dev, n)
+		if (len(dta) < n):
+			raise Si7021BusError("short read ({0} of {1} bytes)".format(len(dta), n))
+		return dta
+	
+	def ScriptStart(self, period=1.0):
+		"""Upload sampling script to pigpiod and start it.
+		Needs PigpioBus transport.
+		Script measure RH & temp. in loop by itself (HOLD MASTER mode, so bus must handle
+		clock stretching) and keeps last SI7021_SCRIPT_RING raw results in script params,
+		collect them with ScriptRead() at least every SI7021_SCRIPT_RING periods.
+		Returns after script opened its I2C handle and cleared params (ready marker p9),
+		so params read later are always script ones, not start arguments.
+		
+		Args:
+			period(float): sampling period in seconds (conversion time is included)
+		
+		Returns:
+			int: pigpio script id
+		
+		Raises:
+			Si7021BusError: script failed or didn't get ready within SI7021_SCRIPT_START_TIMEOUT
+		"""
+		if self.pio is None:
+			raise RuntimeError("on-daemon script needs PigpioBus transport")
+		if self.scriptId is not None:
+			self.ScriptStop()
+		sid = self.pio.store_script(self.SI7021_SCRIPT)
+		while (self.pio.script_status(sid)[0] == self.i2c.pigpio.PI_SCRIPT_INITING):
+			time.sleep(0.001)
+		pause = max(0, int((period - self.ConvTime(True)) * 1000))
+		self.pio.run_script(sid, [self.piBus, self.siAddr, pause, 0, 0, 0, 0, 0, 0, 0])
+		end = time.monotonic() + self.SI7021_SCRIPT_START_TIMEOUT
+		while True:
+			(st, p) = self.pio.script_status(sid)
+			if (p[9] == 1):
+				break
+			if (st not in (self.i2c.pigpio.PI_SCRIPT_RUNNING, self.i2c.pigpio.PI_SCRIPT_WAITING) or time.monotonic() >= end):
+				self.pio.stop_script(sid)
+				self.pio.delete_script(sid)
+				raise Si7021BusError("sampling script didn't start (status {0})".format(st))
+			time.sleep(0.001)
+		self.scriptId = sid
+		self.scriptSeq = 0
+		self.scriptDev = p[8]
+		return sid
+	
+	def ScriptRead(self):
+		"""Collect raw results stored by sampling script since last call.
+		
+		Args:
+		
+		Returns:
+			dict with fields:
+				samples(list[(int,int)]): (rh_code, temp_code) tuples, oldest first
+				lost(int): samples overwritten in ring before they were collected
+				errors(int): read errors count reported by script
+				running(bool): False if script is not running anymore
+		"""
+		# params are copied from daemon while script may update them, so take two
+		# snapshots and accept them only if sequence is even and didn't change
+		while True:
+			(st, p) = self.pio.script_status(self.scriptId)
+			(st2, p2) = self.pio.script_status(self.scriptId)
+			if ((p[0] & 1) == 0 and p[0] == p2[0]):
+				break
+			time.sleep(0.0005)
+		n = (p[0] - self.scriptSeq) // 2
+		self.scriptSeq = p[0]
+		k = min(n, self.SI7021_SCRIPT_RING)
+		samples = []
+		for i in range(k-1, -1, -1):
+			rw = p[1+(i*2)]
+			tw = p[2+(i*2)]
+			# SMBus word is LSB first, chip send MSB first
+			samples.append( ( ((rw&0xff)<<8) | ((rw>>8)&0xff), ((tw&0xff)<<8) | ((tw>>8)&0xff) ) )
+		re = {
+			'samples': samples,
+			'lost': n - k,
+			'errors': p[7],
+			'running': (st2 == self.i2c.pigpio.PI_SCRIPT_RUNNING or st2 == self.i2c.pigpio.PI_SCRIPT_WAITING)
+			}
+		return re
+	
+	def ScriptStop(self):
+		"""Stop and delete sampling script, close I2C handle opened by it.
+		
+		Args:
+		
+		Returns:
+			
+		"""
+		if self.scriptId is None:
+			return
+		self.pio.stop_script(self.scriptId)
+		self.pio.delete_script(self.scriptId)
+		if self.scriptDev is not None:
+			try:
+				self.i2c.close(self.scriptDev)
+			except Si7021BusError:
+				pass
+		self.scriptId = None
+		self.scriptDev = None
+		return
+	
+	def MeasHumi(self, timeout=None):
 		"""
 		Perform Humidity (and temperature) measurement.
-		This use 'NO HOLD MASTER' mode. 
-		The conversion result after issuing command is read back after delay of 30ms.
-		Minimum safe time is about 12ms according to datasheet but 30ms seems to be safer :)
+		In 'NO HOLD MASTER' mode (default) the conversion result is read back after max.
+		conversion time for current resolution (see ConvTime), or as soon as chip ACK read
+		in SI7021_WAIT_POLL mode. In SI7021_READ_MODE_HOLD the read is blocked by chip
+		until conversion is done (see _measureHold).
+		CRC of result is checked according to self.CrcPolicy (result in self.LastCrcOk).
 		
 		Args:
+			timeout(float): max. time [s] for measurement incl. retries of failed reads,
+				Si7021TimeoutError is raised when it is not enough (see _measure)
 			
 		Returns:
 			RH value (int) in 0.01% resolution.
 			To get value with 'decimal part' just div it by 100.0
 		""" 
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		self.pio.i2c_write_byte(dev, self.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER)
-		time.sleep(0.03) # min. about 12ms for humi
-		(cnt, dta) = self.pio.i2c_read_device(dev, 2) # get 2 bytes
-		self.pio.i2c_close(dev)
-		rh_code = ((dta[0]<<8)&0xff00) | dta[1]
-		rh = ((125*rh_code)/65536) - 6
-		rh = rh * 100
-		rhi = int(round(rh))
-		return rhi	
-	
-	def MeasTemp(self):
+		dta = self._measure(self.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER, 3, True, None, timeout) # get 2 bytes + CRC
+		return self._decodeHumi(dta)
+	
+	def MeasTemp(self, timeout=None):
 		"""
 		Perform Temperature measurement.
-		This use 'NO HOLD MASTER' mode.
-		The conversion result after issuing command is read back after delay of 20ms.
-		Minimum safe time is about 11ms according to datasheet but 20ms seems to be safer :)
+		Read mode and waiting for result is the same as in MeasHumi.
+		CRC of result is checked according to self.CrcPolicy (result in self.LastCrcOk).
 
 		Args:
+			timeout(float): max. time [s] for measurement (see MeasHumi)
 
 		Returns:
 			Temperature value (int) in 0.01degC resolution.
 			To get value with 'decimal part' just div it by 100.0
 		"""
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		self.pio.i2c_write_byte(dev, self.SI7021_CMD_MEAS_TEMP_NOHOLD_MASTER)
-		time.sleep(0.02) # min. about 11ms for temp.
-		(cnt, dta) = self.pio.i2c_read_device(dev, 2)
-		self.pio.i2c_close(dev)
-		temp_code = ((dta[0]<<8)&0xff00) | dta[1]
-		temp = ((175.72*temp_code)/65536) - 46.85
-		temp = temp * 100
-		tempi = int(round(temp))
-		return tempi
+		dta = self._measure(self.SI7021_CMD_MEAS_TEMP_NOHOLD_MASTER, 3, False, None, timeout)
+		return self._decodeTemp(dta)
 	
 	
 	def GetLastMeasHumiTemp(self):
 		"""Read temperature from last humidity measurement.
 		(FYI: To measure humidity sensor must measure temperature too.)
+		Two bus transactions with fixed 10ms pause between them, no retries - it has no
+		timeout, time of blocked transaction is limited only by transport (see I2cDevBus timeout).
 		
 		Args:
 
@@ -448,32 +1187,332 @@ class Si7021:
 			Temperature value (int) in 0.01degC resolution.
 			To get value with 'decimal part' just div it by 100.0
 		"""
-		dev = self.pio.i2c_open(self.piBus, self.siAddr)
-		self.pio.i2c_write_byte(dev, self.SI7021_CMD_READ_TEMP_LAST_HUMI)
-		time.sleep(0.01)
-		(cnt, dta) = self.pio.i2c_read_device(dev, 2)
-		self.pio.i2c_close(dev)
-		temp_code = ((dta[0]<<8)&0xff00) | dta[1]
-		temp = ((175.72*temp_code)/65536) - 46.85
-		temp = temp * 100
-		tempi = int(round(temp))
-		return tempi
-
-	def MeasHumiTemp(self):
+		with self._bus() as dev:
+			self.i2c.write_byte(dev, self.SI7021_CMD_READ_TEMP_LAST_HUMI)
+			time.sleep(0.01)
+			dta = self.i2c.read_device(dev, 2)
+		if (len(dta) < 2):
+			raise Si7021BusError("short read ({0} of 2 bytes)".format(len(dta)))
+		return self._decodeTemp(dta)
+
+	def MeasHumiTemp(self, timeout=None):
 		"""Combined version of MeasHumi and GetLastMeasHumiTemp .
+		Measure command is written, then after conversion RH result (with CRC) and
+		temperature of that measurement are read by one transfer (single i2c_zip for pigpio).
+		CRC of RH is checked according to self.CrcPolicy (result in self.LastCrcOk).
 		
 		Args:
+			timeout(float): max. time [s] for measurement (see MeasHumi)
 
 		Returns:
-			dict with 2 fileds, one for humi another for temp:
+			Si7021HumiTemp (dict compatible, see as_dict()) with 2 fileds, one for humi another for temp:
 				humi(int): Humidity in 0.01% resolution
 				temp(int): Temperature in 0.01degC resolution
 			To get value with 'decimal part' just div it by 100.0
 		"""
-		rh = self.MeasHumi()
-		tp = self.GetLastMeasHumiTemp()
-		return { "humi": rh, "temp": tp }
-
+		dta = self._measure(self.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER, 5, True, self.zipHumiTemp, timeout)
+		return self._decodeHumiTemp(dta)
+	
+	def MeasHumiTempInto(self, buf, i=0, timeout=None):
+		"""Same as MeasHumiTemp() but store result into caller's buffer, no result object is created.
+		
+		Args:
+			buf: writable sequence (e.g. array('i'), list), humi goes to buf[i], temp to buf[i+1]
+			i(int): index of humi in buf
+			timeout(float): max. time [s] for measurement (see MeasHumi)
+		
+		Returns:
+			bool: self.LastCrcOk
+		"""
+		dta = self._measure(self.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER, 5, True, self.zipHumiTemp, timeout)
+		buf[i] = self._decodeHumi(dta)
+		buf[i+1] = self._decodeTemp(dta, 3)
+		return self.LastCrcOk
+	
+	def MeasHumiTempRaw(self, timeout=None):
+		"""Same as MeasHumiTemp() but return raw 16bit codes without conversion.
+		
+		Args:
+			timeout(float): max. time [s] for measurement (see MeasHumi)
+		
+		Returns:
+			tuple (rh_code(int), temp_code(int))
+		"""
+		dta = self._measure(self.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER, 5, True, self.zipHumiTemp, timeout)
+		return ( ((dta[0]<<8)&0xff00) | dta[1], ((dta[3]<<8)&0xff00) | dta[4] )
+	
+	def MeasWithin(self, timeout, what=SI7021_MEAS_HUMI_TEMP):
+		"""Measure within time budget and never raise bus/CRC errors.
+		Failed reads are retried with back-off while budget allows (see MeasHumi timeout).
+		When measurement fails (or its CRC is bad), last good value of the same measurement
+		is returned as stale.
+		
+		Args:
+			timeout(float): time budget [s]
+			what(int): SI7021_MEAS_HUMI, SI7021_MEAS_TEMP, SI7021_MEAS_HUMI_TEMP or SI7021_MEAS_HUMI_TEMP_RAW
+		
+		Returns:
+			Si7021Reading
+		"""
+		fn = (self.MeasHumi, self.MeasTemp, self.MeasHumiTemp, self.MeasHumiTempRaw)[what]
+		try:
+			v = fn(timeout=timeout)
+			if not self.LastCrcOk:
+				raise Si7021CrcError("CRC mismatch")
+		except (Si7021BusError, Si7021CrcError) as e:
+			last = self.lastGood.get(what)
+			if last is None:
+				return Si7021Reading(None, self.SI7021_READING_FAILED, None, self.LastRetries, e)
+			return Si7021Reading(last[0], self.SI7021_READING_STALE, last[1], self.LastRetries, e)
+		ts = time.time()
+		self.lastGood[what] = (v, ts)
+		st = self.SI7021_READING_FRESH
+		if self.LastRetries:
+			st = self.SI7021_READING_RETRIED
+		return Si7021Reading(v, st, ts, self.LastRetries)
+	
+	def MeasRaw(self, timeout=None):
+		"""Raw capture - measure RH & temp. without conversion and without raising errors.
+		Sample is also written to self.RawSink if set (e.g. si7021_raw.RawWriter).
+		
+		Args:
+			timeout(float): max. time [s] for measurement (see MeasHumi), SI7021_STATUS_BUS_ERR
+				is returned when it runs out
+		
+		Returns:
+			tuple (timestamp(float), rh_code(int), temp_code(int), status(int - SI7021_STATUS_*))
+			codes are 0 when status is SI7021_STATUS_BUS_ERR
+		"""
+		ts = time.time()
+		try:
+			(rc, tc) = self.MeasHumiTempRaw(timeout=timeout)
+			st = self.SI7021_STATUS_OK
+			if not self.LastCrcOk:
+				st = self.SI7021_STATUS_CRC_ERR
+		except Si7021CrcError:
+			(rc, tc, st) = (0, 0, self.SI7021_STATUS_CRC_ERR)
+		except Si7021BusError:
+			(rc, tc, st) = (0, 0, self.SI7021_STATUS_BUS_ERR)
+		if self.RawSink is not None:
+			self.RawSink.write(ts, rc, tc, st)
+		return (ts, rc, tc, st)
+	
+	def StartHumiTemp(self):
+		"""Issue RH (and temperature) measurement command and return without waiting.
+		Result must be collected with FetchHumiTemp() after ConvTime(True) seconds.
+		Used to measure many sensors at the same time (see Si7021Group).
+		Start and Fetch are single bus transactions without waits or retries, they have
+		no timeout (caller controls the wait, Si7021Group.MeasHumiTemp takes timeout).
+		
+		Args:
+		
+		Returns:
+			
+		"""
+		with self._bus() as dev:
+			t = time.monotonic()
+			self.i2c.write_byte(dev, self.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER)
+			self._xferDone(time.monotonic() - t)
+		return
 	
+	def FetchHumiTemp(self):
+		"""Read result of measurement started by StartHumiTemp() .
+		
+		Args:
+		
+		Returns:
+			Si7021HumiTemp - same as MeasHumiTemp()
+		"""
+		return self._decodeHumiTemp(self._fetch())
+	
+	def FetchHumiTempRaw(self):
+		"""Same as FetchHumiTemp() but return raw 16bit codes without conversion.
+		
+		Args:
+		
+		Returns:
+			tuple (rh_code(int), temp_code(int))
+		"""
+		dta = self._fetch()
+		return ( ((dta[0]<<8)&0xff00) | dta[1], ((dta[3]<<8)&0xff00) | dta[4] )
+	
+	def _fetch(self):
+		# read result of StartHumiTemp() and check CRC (no retry - measurement is not ours to repeat)
+		with self._bus() as dev:
+			dta = self.i2c.transfer(dev, self.zipHumiTemp)
+		if (len(dta) < 5):
+			raise Si7021BusError("short read ({0} of 5 bytes)".format(len(dta)))
+		tbl = CRC8_TABLE
+		self.LastCrcOk = (tbl[tbl[dta[0]] ^ dta[1]] == dta[2])
+		if not self.LastCrcOk:
+			self.CrcErrors += 1
+			self.InvalidateRegs()
+			if self.Instr is not None:
+				self.Instr.count('crc_error')
+		return dta
+	
+	def _decodeHumiTemp(self, dta):
+		# dta: RH_MSB, RH_LSB, RH_CRC, TEMP_MSB, TEMP_LSB
+		return Si7021HumiTemp(self._decodeHumi(dta), self._decodeTemp(dta, 3))
+	
+	def _decodeHumi(self, dta, i=0):
+		# RH code (MSB, LSB at dta[i]) -> RH in 0.01% (formula in si7021_conv)
+		return rh_centi(((dta[i]<<8)&0xff00) | dta[i+1])
+	
+	def _decodeTemp(self, dta, i=0):
+		# Temp. code (MSB, LSB at dta[i]) -> temperature in 0.01degC (formula in si7021_conv)
+		return temp_centi(((dta[i]<<8)&0xff00) | dta[i+1])
 
 
+class Si7021Group:
+	def __init__(self, sensors):
+		"""Group of Si7021 sensors measured at the same time.
+		All sensors get measure command first, then group waits once for the longest
+		conversion and reads results from all of them.
+		
+		Sensors are switched to keep-open mode; handle which can't be opened now (e.g. daemon
+		not running yet) is opened by first measurement, so group creation never fails on bus.
+		
+		Args:
+			sensors: list of (bus, address) tuples and/or Si7021 instances
+		
+		Returns:
+			none
+		"""
+		self.sensors = {}
+		for s in sensors:
+			if not isinstance(s, Si7021):
+				s = Si7021(s[0], s[1])
+			try:
+				s.Open()
+			except Si7021BusError:
+				s.KeepOpen = True
+			self.sensors[(s.piBus, s.siAddr)] = s
+	
+	def __enter__(self):
+		return self
+	
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.Close()
+		return False
+	
+	def Close(self):
+		"""Close all sensors of group.
+		
+		Args:
+		
+		Returns:
+			
+		"""
+		for s in self.sensors.values():
+			s.Close()
+		return
+	
+	def _start(self, deadline, busMax):
+		# start all sensors (those whose conversion & fetch wouldn't fit before deadline are skipped),
+		# wait for the slowest one, return keys of started sensors
+		started = []
+		ready = 0.0
+		for (key, s) in self.sensors.items():
+			if (deadline is not None and time.monotonic() + s.ConvTime(True) + s._busTime(1 + len(s.zipHumiTemp), busMax) > deadline):
+				continue
+			try:
+				s.StartHumiTemp()
+			except Si7021BusError:
+				continue
+			started.append(key)
+			ready = max(ready, time.monotonic() + s.ConvTime(True))
+		wait = ready - time.monotonic()
+		if (wait > 0):
+			time.sleep(wait)
+		return started
+	
+	def _budget(self, timeout):
+		# timeout -> (deadline, cap of expected bus time), see Si7021._measure
+		if timeout is None:
+			return (None, None)
+		return (time.monotonic() + timeout, timeout * Si7021.SI7021_XFER_BUDGET)
+	
+	def _fetchFits(self, s, deadline, busMax):
+		# True if result of sensor 's' can be read before deadline
+		return (deadline is None or time.monotonic() + s._busTime(len(s.zipHumiTemp), busMax) <= deadline)
+	
+	def MeasHumiTemp(self, timeout=None):
+		"""Measure RH & temperature of all sensors in group.
+		
+		Args:
+			timeout(float): max. time [s] for whole group - sensors which can't be measured
+				within it (incl. expected bus time) are not started or read (result None)
+		
+		Results are not repeated on CRC mismatch, CrcPolicy of sensor decides: SI7021_CRC_IGNORE
+		returns the result, SI7021_CRC_RETRY gives None and SI7021_CRC_RAISE raises Si7021CrcError
+		(after all sensors are read).
+		
+		Returns:
+			dict: (bus, address) -> Si7021HumiTemp same as Si7021.MeasHumiTemp(),
+			or None if sensor failed (bus error, timeout, CRC mismatch)
+		"""
+		(deadline, busMax) = self._budget(timeout)
+		started = self._start(deadline, busMax)
+		re = dict.fromkeys(self.sensors)
+		crcErr = []
+		for key in started:
+			s = self.sensors[key]
+			if not self._fetchFits(s, deadline, busMax):
+				continue
+			try:
+				m = s.FetchHumiTemp()
+			except Si7021BusError:
+				continue
+			if (s.LastCrcOk or s.CrcPolicy == Si7021.SI7021_CRC_IGNORE):
+				re[key] = m
+			elif (s.CrcPolicy == Si7021.SI7021_CRC_RAISE):
+				crcErr.append(key)
+		if crcErr:
+			raise Si7021CrcError("CRC mismatch of sensors {0}".format(", ".join("{0}:0x{1:02X}".format(b, a) for (b, a) in crcErr)))
+		return re
+	
+	def ApplyConfig(self, resolution=None, heater_enable=None, heater_level=None):
+		"""Apply the same config to all sensors in group (see Si7021.ApplyConfig).
+		
+		Args:
+			resolution(int): RES[1:0] bits value, None = keep
+			heater_enable(bool): HTRE bit, None = keep
+			heater_level(int): heater register value (0..15), None = keep
+		
+		Returns:
+			dict: (bus, address) -> result of Si7021.ApplyConfig(), or None if sensor failed (bus error)
+		"""
+		re = dict.fromkeys(self.sensors)
+		for (key, s) in self.sensors.items():
+			try:
+				re[key] = s.ApplyConfig(resolution, heater_enable, heater_level)
+			except Si7021BusError:
+				pass
+		return re
+	
+	def MeasRaw(self, timeout=None):
+		"""Measure all sensors in group, raw codes (see Si7021.MeasRaw).
+		
+		Args:
+			timeout(float): max. time [s] for whole group (see MeasHumiTemp), sensors
+				not measured within it get SI7021_STATUS_BUS_ERR
+		
+		Returns:
+			dict: (bus, address) -> tuple (timestamp(float), rh_code(int), temp_code(int), status(int - SI7021_STATUS_*))
+		"""
+		(deadline, busMax) = self._budget(timeout)
+		started = set(self._start(deadline, busMax))
+		re = {}
+		for key in self.sensors:
+			s = self.sensors[key]
+			if (key not in started or not self._fetchFits(s, deadline, busMax)):
+				re[key] = (time.time(), 0, 0, Si7021.SI7021_STATUS_BUS_ERR)
+				continue
+			try:
+				(rc, tc) = s.FetchHumiTempRaw()
+				st = Si7021.SI7021_STATUS_OK if s.LastCrcOk else Si7021.SI7021_STATUS_CRC_ERR
+			except Si7021BusError:
+				(rc, tc, st) = (0, 0, Si7021.SI7021_STATUS_BUS_ERR)
+			re[key] = (time.time(), rc, tc, st)
+		return re
@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""asyncio interface for Si7021
+
+AsyncSi7021 wraps Si7021 class and provides coroutine versions of measurement
+methods. Conversion waits are done with asyncio.sleep, so one event loop can
+measure many sensors at the same time.
+I2C transactions itself are short transport calls and are done directly (not in
+executor), each one under asyncio lock of its bus, the lock is not held while
+waiting for conversion, so other sensors on the same bus can be used meanwhile.
+Whole operations on one sensor are serialized by its own lock (chip can do
+only one conversion at a time).
+Measurements take optional 'timeout' (whole operation incl. waiting for locks is
+cancelled and Si7021TimeoutError raised), ReadSettings and ReadSN are plain bus
+transactions without timeout.
+
+License:
+	MIT
+
+"""
+
+import time
+import asyncio
+from si7021 import Si7021, Si7021TimeoutError
+from si7021_bus import Si7021BusError
+
+# bus number -> asyncio.Lock
+_bus_locks = {}
+
+def bus_lock(bus):
+	"""Return asyncio lock shared by all AsyncSi7021 on I2C bus 'bus'."""
+	lck = _bus_locks.get(bus)
+	if lck is None:
+		lck = _bus_locks[bus] = asyncio.Lock()
+	return lck
+
+
+class AsyncSi7021:
+	def __init__(self, _piBus, _siAddr=0x40, _si=None):
+		"""Initialize asyncio Si7021 interface.
+		I2C handle is opened once and kept until Close() (Si7021 keep-open mode).
+
+		Args:
+			_piBus: Raspberry Pi I2C bus number
+			_siAddr: Si7021 I2C address (0x40 default)
+			_si: already created Si7021 instance to wrap (bus/address args are ignored then)
+
+		Returns:
+			none
+		"""
+		if _si is None:
+			_si = Si7021(_piBus, _siAddr)
+		self.si = _si
+		self.si.Open()
+		self.lock = bus_lock(self.si.piBus)
+		self.devLock = asyncio.Lock()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_val, exc_tb):
+		self.Close()
+		return False
+
+	def Close(self):
+		"""Release I2C handle and transport of wrapped Si7021.
+
+		Args:
+
+		Returns:
+
+		"""
+		self.si.Close()
+		return
+
+	async def _measure(self, cmd, n, humi, zip=None):
+		"""Async version of Si7021._measure - trigger, await result, check CRC (and retry)."""
+		tries = 0
+		while True:
+			async with self.lock:
+				with self.si._bus() as dev:
+					self.si.i2c.write_byte(dev, cmd)
+			dta = await self._readResult(n, humi, zip)
+			if self.si._crcDone(dta, tries):
+				return dta
+			tries += 1
+
+	async def _readResult(self, n, humi, zip=None):
+		"""Async version of Si7021._readResult - await conversion end and read result."""
+		si = self.si
+		t = si.ConvTime(humi)
+		if (si.WaitMode != si.SI7021_WAIT_POLL):
+			await asyncio.sleep(t)
+			async with self.lock:
+				with si._bus() as dev:
+					return si._read(dev, n, zip)
+		await asyncio.sleep(t * 0.5)
+		deadline = time.monotonic() + (t * 1.5)
+		backoff = si.SI7021_POLL_BACKOFF_MIN
+		while True:
+			async with self.lock:
+				with si._bus() as dev:
+					# NACK is caught inside, so it doesn't close keep-open handle
+					try:
+						return si._read(dev, n, zip)
+					except Si7021BusError:
+						if (time.monotonic() >= deadline):
+							raise
+						if si.Instr is not None:
+							si.Instr.count('retry')
+			await asyncio.sleep(backoff)
+			backoff = min(backoff*2, si.SI7021_POLL_BACKOFF_MAX)
+
+	async def _within(self, cmd, n, humi, zip=None, timeout=None):
+		"""Run _measure under device lock, cancelled after 'timeout' seconds (None = no limit)."""
+		async def meas():
+			async with self.devLock:
+				return await self._measure(cmd, n, humi, zip)
+		if timeout is None:
+			return await meas()
+		try:
+			return await asyncio.wait_for(meas(), timeout)
+		except asyncio.TimeoutError:
+			raise Si7021TimeoutError("measurement not done within {0}s".format(timeout))
+
+	async def MeasHumi(self, timeout=None):
+		"""Async version of Si7021.MeasHumi .
+
+		Args:
+			timeout(float): max. time [s] for measurement, Si7021TimeoutError is raised after it
+
+		Returns:
+			RH value (int) in 0.01% resolution.
+		"""
+		dta = await self._within(self.si.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER, 3, True, None, timeout)
+		return self.si._decodeHumi(dta)
+
+	async def MeasTemp(self, timeout=None):
+		"""Async version of Si7021.MeasTemp .
+
+		Args:
+			timeout(float): max. time [s] for measurement (see MeasHumi)
+
+		Returns:
+			Temperature value (int) in 0.01degC resolution.
+		"""
+		dta = await self._within(self.si.SI7021_CMD_MEAS_TEMP_NOHOLD_MASTER, 3, False, None, timeout)
+		return self.si._decodeTemp(dta)
+
+	async def MeasHumiTemp(self, timeout=None):
+		"""Async version of Si7021.MeasHumiTemp .
+
+		Args:
+			timeout(float): max. time [s] for measurement (see MeasHumi)
+
+		Returns:
+			Si7021HumiTemp with fields humi(int) and temp(int) - same as Si7021.MeasHumiTemp()
+		"""
+		dta = await self._within(self.si.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER, 5, True, self.si.zipHumiTemp, timeout)
+		return self.si._decodeHumiTemp(dta)
+
+	async def ReadSettings(self, cached=False):
+		"""Async version of Si7021.ReadSettings (no waits inside, only bus lock is awaited).
+
+		Args:
+			cached(bool): see Si7021.ReadSettings
+
+		Returns:
+			dict - same as Si7021.ReadSettings()
+		"""
+		if (cached and self.si.userReg is not None and self.si.heaterReg is not None):
+			return self.si.ReadSettings(True)
+		async with self.devLock, self.lock:
+			return self.si.ReadSettings(cached)
+
+	async def ReadSN(self):
+		"""Async version of Si7021.ReadSN (no waits inside, only bus lock is awaited).
+
+		Args:
+
+		Returns:
+			dict - same as Si7021.ReadSN()
+		"""
+		async with self.devLock, self.lock:
+			return self.si.ReadSN()
@@ -0,0 +1,221 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Si7021 read path benchmarks
+
+Measure every read path of Si7021 class (table / poll wait, HOLD MASTER mode) and
+report sustained samples/sec, p50/p99 latency, CPU time and bus transactions per
+reading, optionally for every measurement resolution (SetSampling) and for group
+of sensors. By default it runs on simulated chip (si7021_sim), so it works on any
+Linux box and can be used to catch performance regressions; with --sensor it runs
+on real hardware.
+
+Usage:
+	python3 si7021_bench.py [-n 50] [--res 0,1,2,3] [--path MeasHumi,MeasHumiTemp] [--json]
+	python3 si7021_bench.py --sensor 1:0x40 [--sensor 3:0x40] [--transport i2cdev]
+	python3 si7021_bench.py --help
+
+License:
+	MIT
+
+"""
+
+import sys
+import json
+import time
+import argparse
+from si7021 import Si7021, Si7021Group
+from si7021_bus import MemoryBus, PigpioBus, I2cDevBus
+from si7021_sim import SimSi7021
+from si7021_exporter import parse_sensor
+
+def percentile(sorted_vals, p):
+	"""Return p-th percentile (0..100) of already sorted list (nearest rank)."""
+	if not sorted_vals:
+		return 0.0
+	k = int(round((p / 100.0) * (len(sorted_vals) - 1)))
+	return sorted_vals[k]
+
+def bench(fn, n, transports=()):
+	"""Call 'fn' n times and collect statistics.
+
+	Args:
+		fn: callable doing one reading
+		n(int): number of calls
+		transports: transports (with 'calls' counter) used by fn, to count bus transactions
+
+	Returns:
+		dict with fields:
+			n(int): readings done
+			rate(float): readings per second
+			p50(float): median latency [s]
+			p99(float): 99th percentile latency [s]
+			cpu(float): process CPU time per reading [s]
+			bus_calls(float): bus transactions per reading
+	"""
+	lat = [0.0] * n
+	calls0 = sum(t.calls for t in transports)
+	cpu0 = time.process_time()
+	t0 = time.perf_counter()
+	for i in range(n):
+		t = time.perf_counter()
+		fn()
+		lat[i] = time.perf_counter() - t
+	total = time.perf_counter() - t0
+	cpu = time.process_time() - cpu0
+	calls = sum(t.calls for t in transports) - calls0
+	lat.sort()
+	re = {
+		'n': n,
+		'rate': n / total if total > 0 else 0.0,
+		'p50': percentile(lat, 50),
+		'p99': percentile(lat, 99),
+		'cpu': cpu / float(n) if n else 0.0,
+		'bus_calls': calls / float(n) if n else 0.0
+		}
+	return re
+
+def sim_sensor(keep_open=True, wait_mode=Si7021.SI7021_WAIT_TABLE, bus=1, **sim_args):
+	"""Create Si7021 on simulated chip, return (si, transport)."""
+	tr = MemoryBus(SimSi7021(**sim_args))
+	si = Si7021(bus, _keepOpen=keep_open, _waitMode=wait_mode, _transport=tr)
+	return (si, tr)
+
+def hw_sensor(bus, addr=Si7021.SI7021_DEF_ADDR, keep_open=True, wait_mode=Si7021.SI7021_WAIT_TABLE, transport='pigpio'):
+	"""Create Si7021 on real chip, return (si, transport).
+
+	Args:
+		bus(int): I2C bus number
+		addr(int): I2C address
+		keep_open(bool): keep-open mode
+		wait_mode(int): SI7021_WAIT_TABLE or SI7021_WAIT_POLL
+		transport(str): 'pigpio' (PigpioBus) or 'i2cdev' (I2cDevBus)
+
+	Returns:
+		tuple (Si7021, transport)
+	"""
+	if (transport == 'i2cdev'):
+		tr = I2cDevBus(bus, addr)
+	else:
+		tr = PigpioBus(bus, addr)
+	si = Si7021(bus, addr, _keepOpen=keep_open, _waitMode=wait_mode, _transport=tr)
+	return (si, tr)
+
+def read_paths(si):
+	"""Return list of (name, callable) for all single sensor read paths."""
+	return [
+		('MeasHumi', si.MeasHumi),
+		('MeasTemp', si.MeasTemp),
+		('MeasHumiTemp', si.MeasHumiTemp),
+		('MeasHumiTempRaw', si.MeasHumiTempRaw),
+		('GetLastMeasHumiTemp', si.GetLastMeasHumiTemp),
+		('ReadSettings', si.ReadSettings),
+		('ReadSN', si.ReadSN)
+		]
+
+def run_suite(n=50, sensors=8, resolutions=(0,), paths=None, factory=None, **sim_args):
+	"""Run read paths on simulated (default) or real chips.
+
+	Args:
+		n(int): readings per path
+		sensors(int): sensors in Si7021Group test (< 2 = no group test)
+		resolutions: RES[1:0] values (SetSampling) to run measurement paths with
+		paths: names of read paths to run (all if None)
+		factory: callable(i, keep_open, wait_mode) -> (si, transport) creating i-th sensor,
+			simulated chip with 'sim_args' if None
+		sim_args: SimSi7021 arguments (latency, conv_scale, ...)
+
+	Returns:
+		list of (name, bench() dict), dict has extra fields path, wait, res, sensors
+	"""
+	if factory is None:
+		factory = lambda i, keep_open, wait_mode: sim_sensor(keep_open, wait_mode, bus=i, **sim_args)
+	re = []
+	def add(path, wait, res, cnt, r):
+		tag = wait
+		if (res is not None and tuple(resolutions) != (0,)):
+			tag += ",res={0}".format(res)
+		if (cnt > 1):
+			tag += ",{0}".format(cnt)
+		r.update({ 'path': path, 'wait': wait, 'res': res, 'sensors': cnt })
+		re.append(("{0}[{1}]".format(path, tag), r))
+	for res in resolutions:
+		for (mode, wm) in (('table', Si7021.SI7021_WAIT_TABLE), ('poll', Si7021.SI7021_WAIT_POLL), ('hold', Si7021.SI7021_WAIT_TABLE)):
+			(si, tr) = factory(0, True, wm)
+			if (mode == 'hold'):
+				si.ReadMode = Si7021.SI7021_READ_MODE_HOLD
+			si.SetSampling(res)
+			for (name, fn) in read_paths(si):
+				if (paths is not None and name not in paths):
+					continue
+				meas = name.startswith('Meas')
+				# only measurements depend on read/wait mode & resolution
+				if (not meas and (mode != 'table' or res != resolutions[0])):
+					continue
+				if (mode == 'hold' and name == 'GetLastMeasHumiTemp'):
+					continue
+				add(name, mode, res if meas else None, 1, bench(fn, n, (tr,)))
+			si.Close()
+		if (paths is None or 'MeasHumiTemp' in paths):
+			(si, tr) = factory(0, False, Si7021.SI7021_WAIT_TABLE)
+			si.SetSampling(res)
+			add('MeasHumiTemp', 'no keep-open', res, 1, bench(si.MeasHumiTemp, n, (tr,)))
+			si.Close()
+		if (sensors > 1 and (paths is None or 'Si7021Group.MeasHumiTemp' in paths)):
+			group = []
+			trs = []
+			for i in range(sensors):
+				(si, tr) = factory(i, True, Si7021.SI7021_WAIT_TABLE)
+				si.SetSampling(res)
+				group.append(si)
+				trs.append(tr)
+			with Si7021Group(group) as g:
+				r = bench(g.MeasHumiTemp, n, trs)
+			# group reading gives 'sensors' samples
+			r['rate'] *= sensors
+			r['cpu'] /= sensors
+			r['bus_calls'] /= sensors
+			add('Si7021Group.MeasHumiTemp', 'table', res, sensors, r)
+	return re
+
+def print_results(results):
+	print("{0:<44} {1:>10} {2:>10} {3:>10} {4:>10} {5:>10}".format("read path", "samples/s", "p50 ms", "p99 ms", "cpu ms", "bus/read"))
+	for (name, r) in results:
+		print("{0:<44} {1:>10.1f} {2:>10.3f} {3:>10.3f} {4:>10.3f} {5:>10.2f}".format(name, r['rate'], r['p50']*1000, r['p99']*1000, r['cpu']*1000, r['bus_calls']))
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Si7021 read path benchmark (simulated chip unless --sensor is given)")
+	ap.add_argument("-n", type=int, default=50, help="readings per path (default 50)")
+	ap.add_argument("--res", default="0", help="comma separated RES[1:0] values 0..3 or 'all' (default 0)")
+	ap.add_argument("--path", help="comma separated read paths to run (default all)")
+	ap.add_argument("--sensor", action="append", type=parse_sensor, metavar="BUS[:ADDR]", help="real sensor (repeatable, more sensors = group test too)")
+	ap.add_argument("--transport", choices=("pigpio", "i2cdev"), default="pigpio", help="bus transport for real sensors")
+	ap.add_argument("--sensors", type=int, default=8, help="simulated sensors in group test (default 8, 0 = none)")
+	ap.add_argument("--latency", type=float, default=0.0, help="simulated bus latency per message [s]")
+	ap.add_argument("--conv-scale", type=float, default=1.0, help="simulated conversion time multiplier")
+	ap.add_argument("--json", action="store_true", help="print results as JSON")
+	args = ap.parse_args(argv)
+	res = (0, 1, 2, 3) if args.res == "all" else tuple(int(r, 0) & 0x03 for r in args.res.split(","))
+	paths = args.path.split(",") if args.path else None
+	if args.sensor:
+		specs = args.sensor
+		factory = lambda i, keep_open, wait_mode: hw_sensor(specs[i][0], specs[i][1], keep_open, wait_mode, args.transport)
+		results = run_suite(args.n, len(specs), res, paths, factory)
+	else:
+		results = run_suite(args.n, args.sensors, res, paths, latency=args.latency, conv_scale=args.conv_scale)
+	if args.json:
+		cfg = {
+			'n': args.n,
+			'res': res,
+			'target': [ "{0}:0x{1:02X}".format(b, a) for (b, a) in args.sensor ] if args.sensor else "sim",
+			'transport': args.transport if args.sensor else "memory"
+			}
+		json.dump({ 'config': cfg, 'results': [ dict(r, name=name) for (name, r) in results ] }, sys.stdout, indent=1)
+		print()
+	else:
+		print_results(results)
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,386 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""I2C transports for Si7021 class
+
+Si7021 class does all bus operations through transport object bound to one
+device (bus + address). Every transport provide the same methods:
+	open() -> handle
+	close(handle)
+	write_byte(handle, b)
+	read_device(handle, n) -> bytes (may be shorter than n)
+	read_byte_data(handle, reg) -> int
+	write_byte_data(handle, reg, val)
+	transfer(handle, msgs, combined=False) -> bytes
+		msgs is sequence of ('w', bytes) and ('r', count) messages, read data are
+		returned concatenated. With combined=True messages are joined with repeated
+		start into one transaction (like i2c_zip with "On" command).
+	stop() - release connection/resources
+	calls - number of bus transactions done (daemon calls incl. open/close / ioctls)
+Failed transaction raise Si7021BusError.
+
+Backends:
+	PigpioBus - pigpiod daemon (pigpio python module), connection shared by PigpioPool
+	I2cDevBus - Linux /dev/i2c-N, every operation is one I2C_RDWR ioctl (no daemon)
+	MemoryBus - in-memory device model (for tests and benchmarks)
+
+License:
+	MIT
+
+"""
+
+import os
+import fcntl
+import ctypes
+import threading
+
+
+class Si7021BusError(IOError):
+	"""I2C transaction failed (NACK, timeout, closed handle...)."""
+	pass
+
+
+class PigpioPool:
+	def __init__(self):
+		"""Shared pigpio daemon connection.
+		All PigpioBus transports using the pool share one pigpio.pi connection
+		(pigpio.pi is thread safe), it is opened by first acquire() and closed
+		when last user release() it. Pool also provide one lock per I2C bus.
+
+		Args:
+
+		Returns:
+			none
+		"""
+		self.lock = threading.Lock()
+		self.pio = None
+		self.refs = 0
+		self.busLocks = {}
+
+	def acquire(self):
+		"""Return shared pigpio.pi connection (connect if needed) and take reference.
+		Raise Si7021BusError if daemon can't be connected (failed connection is not kept,
+		next acquire() tries again).
+		"""
+		with self.lock:
+			if self.pio is None:
+				import pigpio
+				pio = pigpio.pi()
+				if not pio.connected:
+					pio.stop()
+					raise Si7021BusError("can't connect to pigpio daemon")
+				self.pio = pio
+			self.refs += 1
+			return self.pio
+
+	def release(self):
+		"""Drop reference taken by acquire(), last one closes the connection."""
+		with self.lock:
+			self.refs -= 1
+			if (self.refs <= 0 and self.pio is not None):
+				self.pio.stop()
+				self.pio = None
+				self.refs = 0
+
+	def bus_lock(self, bus):
+		"""Return lock serializing transactions on I2C bus 'bus'."""
+		with self.lock:
+			lck = self.busLocks.get(bus)
+			if lck is None:
+				lck = self.busLocks[bus] = threading.RLock()
+			return lck
+
+# default pool used by PigpioBus
+PIGPIO_POOL = PigpioPool()
+
+
+class PigpioBus:
+	def __init__(self, _piBus, _siAddr, _pio=None, _pool=None):
+		"""pigpiod transport.
+		Nothing is imported nor connected here - pigpio module is imported and daemon
+		connection taken from pool on first bus operation (see connect).
+		Every transaction is done under bus lock of the pool.
+
+		Args:
+			_piBus: I2C bus number
+			_siAddr: device I2C address
+			_pio: pigpio.pi connection to use instead of pool one (not closed by stop)
+			_pool: PigpioPool to take connection from (PIGPIO_POOL if omitted)
+
+		Returns:
+			none
+		"""
+		self.pigpio = None
+		if _pio is not None:
+			# caller has pigpio imported already
+			import pigpio
+			self.pigpio = pigpio
+		if _pool is None:
+			_pool = PIGPIO_POOL
+		self.pool = _pool
+		self.piBus = int(_piBus)
+		self.siAddr = int(_siAddr)
+		self.ownPio = _pio is None
+		self.pio = _pio
+		self.lock = _pool.bus_lock(self.piBus)
+		self.calls = 0
+		# msgs -> i2c_zip command list
+		self.zips = {}
+
+	def connect(self):
+		"""Import pigpio and take connection from pool (if not done yet), return pigpio.pi connection."""
+		if self.pigpio is None:
+			import pigpio
+			self.pigpio = pigpio
+		if self.pio is None:
+			self.pio = self.pool.acquire()
+		return self.pio
+
+	def stop(self):
+		"""Give connection back to pool."""
+		if (self.ownPio and self.pio is not None):
+			self.pio = None
+			self.pool.release()
+
+	def open(self):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				return pio.i2c_open(self.piBus, self.siAddr)
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+
+	def close(self, h):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				pio.i2c_close(h)
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+
+	def write_byte(self, h, b):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				pio.i2c_write_byte(h, b)
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+
+	def read_device(self, h, n):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				(cnt, dta) = pio.i2c_read_device(h, n)
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+		return bytes(dta[:cnt])
+
+	def read_byte_data(self, h, reg):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				return pio.i2c_read_byte_data(h, reg)
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+
+	def write_byte_data(self, h, reg, val):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				pio.i2c_write_byte_data(h, reg, val)
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+
+	def _zip(self, msgs, combined):
+		# build i2c_zip commands: [On] Address, Write/Read..., End
+		key = (tuple(msgs), combined)
+		z = self.zips.get(key)
+		if z is None:
+			z = []
+			if combined:
+				z.append(2)
+			z += [4, self.siAddr]
+			for (op, arg) in msgs:
+				if (op == 'w'):
+					z += [7, len(arg)]
+					z += list(arg)
+				else:
+					z += [6, arg]
+			z.append(0)
+			self.zips[key] = z
+		return z
+
+	def transfer(self, h, msgs, combined=False):
+		pio = self.pio or self.connect()
+		self.calls += 1
+		try:
+			with self.lock:
+				(cnt, dta) = pio.i2c_zip(h, self._zip(msgs, combined))
+		except self.pigpio.error as e:
+			raise Si7021BusError(str(e))
+		return bytes(dta[:cnt])
+
+
+# linux/i2c.h & linux/i2c-dev.h
+I2C_RDWR = 0x0707
+I2C_TIMEOUT = 0x0702
+I2C_M_RD = 0x0001
+
+class _i2c_msg(ctypes.Structure):
+	_fields_ = [ ('addr', ctypes.c_uint16), ('flags', ctypes.c_uint16), ('len', ctypes.c_uint16), ('buf', ctypes.c_void_p) ]
+
+class _i2c_rdwr_ioctl_data(ctypes.Structure):
+	_fields_ = [ ('msgs', ctypes.POINTER(_i2c_msg)), ('nmsgs', ctypes.c_uint32) ]
+
+
+class I2cDevBus:
+	def __init__(self, _piBus, _siAddr, _timeout=None):
+		"""Linux i2c-dev transport (/dev/i2c-N), no daemon in the way.
+		Every operation (incl. register read = write + repeated start + read) is
+		done by single I2C_RDWR ioctl.
+
+		Args:
+			_piBus: I2C bus number (N in /dev/i2c-N)
+			_siAddr: device I2C address
+			_timeout: adapter timeout [s] set on open (I2C_TIMEOUT, 10ms units), bounds
+				clock stretching in HOLD MASTER mode; adapter default if None
+
+		Returns:
+			none
+		"""
+		self.piBus = int(_piBus)
+		self.siAddr = int(_siAddr)
+		self.path = "/dev/i2c-{0}".format(self.piBus)
+		self.timeout = _timeout
+		self.calls = 0
+
+	def stop(self):
+		pass
+
+	def open(self):
+		try:
+			h = os.open(self.path, os.O_RDWR)
+		except OSError as e:
+			raise Si7021BusError(str(e))
+		if self.timeout is not None:
+			try:
+				fcntl.ioctl(h, I2C_TIMEOUT, max(1, int(round(self.timeout * 100))))
+			except OSError as e:
+				os.close(h)
+				raise Si7021BusError(str(e))
+		return h
+
+	def close(self, h):
+		try:
+			os.close(h)
+		except OSError as e:
+			raise Si7021BusError(str(e))
+
+	def _rdwr(self, h, msgs):
+		# msgs: list of ('w', bytes) / ('r', count), return list of read buffers
+		n = len(msgs)
+		cm = (_i2c_msg * n)()
+		bufs = []
+		for (i, (op, arg)) in enumerate(msgs):
+			if (op == 'w'):
+				b = ctypes.create_string_buffer(bytes(arg), len(arg))
+				cm[i].flags = 0
+			else:
+				b = ctypes.create_string_buffer(arg)
+				cm[i].flags = I2C_M_RD
+			cm[i].addr = self.siAddr
+			cm[i].len = len(b)
+			cm[i].buf = ctypes.addressof(b)
+			bufs.append((op, b))
+		data = _i2c_rdwr_ioctl_data(cm, n)
+		self.calls += 1
+		try:
+			fcntl.ioctl(h, I2C_RDWR, data)
+		except OSError as e:
+			raise Si7021BusError(str(e))
+		return [ b.raw for (op, b) in bufs if op == 'r' ]
+
+	def write_byte(self, h, b):
+		self._rdwr(h, [('w', (b,))])
+
+	def read_device(self, h, n):
+		return self._rdwr(h, [('r', n)])[0]
+
+	def read_byte_data(self, h, reg):
+		return self._rdwr(h, [('w', (reg,)), ('r', 1)])[0][0]
+
+	def write_byte_data(self, h, reg, val):
+		self._rdwr(h, [('w', (reg, val))])
+
+	def transfer(self, h, msgs, combined=False):
+		if combined:
+			return b"".join(self._rdwr(h, msgs))
+		re = b""
+		for m in msgs:
+			for r in self._rdwr(h, [m]):
+				re += r
+		return re
+
+
+class MemoryBus:
+	def __init__(self, _device):
+		"""In-memory transport - bus operations are passed to device model object.
+		Device must provide:
+			write(data) - master wrote bytes 'data' (one message)
+			read(n) -> bytes - master read 'n' bytes (one message)
+		and raise Si7021BusError for NACK.
+
+		Args:
+			_device: device model (e.g. si7021_sim.SimSi7021)
+
+		Returns:
+			none
+		"""
+		self.device = _device
+		self.calls = 0
+		self.handles = 0
+
+	def stop(self):
+		pass
+
+	def open(self):
+		# counted like pigpio i2c_open/i2c_close daemon calls
+		self.calls += 1
+		self.handles += 1
+		return self.handles
+
+	def close(self, h):
+		self.calls += 1
+
+	def write_byte(self, h, b):
+		self.calls += 1
+		self.device.write(bytes((b,)))
+
+	def read_device(self, h, n):
+		self.calls += 1
+		return bytes(self.device.read(n))
+
+	def read_byte_data(self, h, reg):
+		self.calls += 1
+		self.device.write(bytes((reg,)))
+		return self.device.read(1)[0]
+
+	def write_byte_data(self, h, reg, val):
+		self.calls += 1
+		self.device.write(bytes((reg, val)))
+
+	def transfer(self, h, msgs, combined=False):
+		self.calls += 1
+		re = b""
+		for (op, arg) in msgs:
+			if (op == 'w'):
+				self.device.write(bytes(arg))
+			else:
+				re += bytes(self.device.read(arg))
+		return re
@@ -0,0 +1,303 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Multi-process Si7021 collector
+
+Si7021Collector starts one worker process per I2C bus. Every worker owns Si7021
+instances of its bus, measures them together (Si7021Group.MeasRaw) every period
+and publishes raw codes into fixed layout shared memory table
+(multiprocessing.shared_memory), so buses are sampled in parallel without GIL
+sharing and any process can read latest results without locks or IPC.
+
+Table layout (little endian):
+	header - 16 bytes: magic b"SI7021C" + version (1), slot count (uint32), padding
+	slots - 24 bytes each: seq (uint32), count (uint32), timestamp (double),
+		rh_code (uint16), temp_code (uint16), status (uint8), bus (uint8), addr (uint8), padding
+Every slot has one writer and is guarded by sequence lock: writer makes 'seq' odd,
+writes the slot and makes it even again; reader retries when 'seq' is odd or
+changed while reading (up to COLL_READ_TIMEOUT, writer probably died in the
+middle of update after that).
+Workers get fresh pigpio connection pool, daemon connection of parent process
+(inherited by fork) is never used by them.
+Slots start with SI7021_STATUS_NO_DATA. Parent watches its workers: dead worker
+is restarted (slot left in the middle of update is fixed first), its exit code is
+kept in Si7021Collector.failures and Workers() shows state of all of them.
+
+Example:
+	with Si7021Collector([(1, 0x40), (3, 0x40), (4, 0x40)], period=0.5) as c:
+		...
+		print(c.table.ReadAll())
+	# other process:
+	t = Si7021Table("si7021")
+	(ts, rc, tc, status, count) = t.Read(0)
+
+License:
+	MIT
+
+"""
+
+import time
+import struct
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import si7021_bus
+from si7021 import Si7021, Si7021Group
+from si7021_sampler import PeriodTimer
+
+COLL_MAGIC = b"SI7021C\x01"
+COLL_HEADER = struct.Struct("<8sI4x")
+COLL_SLOT = struct.Struct("<IIdHHBBBx")
+COLL_SEQ = struct.Struct("<I")
+# max. time [s] reader waits for slot being written
+COLL_READ_TIMEOUT = 0.1
+
+# names of tables created by this process
+_created = set()
+
+
+def _slot_offset(i):
+	return COLL_HEADER.size + (i * COLL_SLOT.size)
+
+def _attach(name, untrack=True):
+	# attach existing segment; creator is the only owner, so it must not be
+	# unlinked by resource tracker of other process when it ends (workers share
+	# tracker with creator, so they must not touch it)
+	shm = shared_memory.SharedMemory(name)
+	if (untrack and name not in _created):
+		try:
+			from multiprocessing import resource_tracker
+			resource_tracker.unregister(shm._name, "shared_memory")
+		except Exception:
+			pass
+	return shm
+
+
+class Si7021Table:
+	def __init__(self, name, _shm=None):
+		"""Attach result table of running Si7021Collector.
+
+		Args:
+			name(str): shared memory name (Si7021Collector.name)
+
+		Returns:
+			none
+		"""
+		self.own = _shm is None
+		self.shm = _shm if _shm is not None else _attach(name)
+		self.buf = self.shm.buf
+		(magic, n) = COLL_HEADER.unpack_from(self.buf, 0)
+		if (magic != COLL_MAGIC):
+			raise ValueError("{0}: not a Si7021 collector table".format(name))
+		self.n = n
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.Close()
+		return False
+
+	def __len__(self):
+		return self.n
+
+	def Sensors(self):
+		"""Return list of (bus, addr) of all slots."""
+		re = []
+		for i in range(self.n):
+			s = COLL_SLOT.unpack_from(self.buf, _slot_offset(i))
+			re.append((s[6], s[7]))
+		return re
+
+	def Read(self, i):
+		"""Return latest result of slot 'i'.
+
+		Args:
+			i(int): slot index (order of sensors given to Si7021Collector)
+
+		Returns:
+			tuple (timestamp(float), rh_code(int), temp_code(int), status(int - SI7021_STATUS_*), count(int))
+			count is number of measurements done so far (0 = no result yet)
+
+		Raises:
+			RuntimeError: slot stays in the middle of update longer than COLL_READ_TIMEOUT
+		"""
+		off = _slot_offset(i)
+		end = None
+		while True:
+			s = COLL_SLOT.unpack_from(self.buf, off)
+			if ((s[0] & 1) == 0 and COLL_SEQ.unpack_from(self.buf, off)[0] == s[0]):
+				return (s[2], s[3], s[4], s[5], s[1])
+			if end is None:
+				end = time.monotonic() + COLL_READ_TIMEOUT
+			elif (time.monotonic() >= end):
+				raise RuntimeError("slot {0} is being updated for too long (worker died?)".format(i))
+			time.sleep(0)
+
+	def ReadAll(self):
+		"""Return dict (bus, addr) -> Read() tuple of all slots."""
+		return dict(((b, a), self.Read(i)) for (i, (b, a)) in enumerate(self.Sensors()))
+
+	def Close(self):
+		if self.buf is not None:
+			self.buf = None
+			if self.own:
+				self.shm.close()
+
+
+def _worker(name, bus, slots, period, timeout, stop, factory):
+	# worker process: measure sensors of one bus and publish results
+	# pool inherited from parent may hold parent's daemon connection (socket shared with
+	# it after fork) - don't touch it, PigpioBus picks the new pool up
+	si7021_bus.PIGPIO_POOL = si7021_bus.PigpioPool()
+	shm = _attach(name, False)
+	buf = shm.buf
+	sensors = []
+	for (i, addr) in slots:
+		sensors.append(factory(bus, addr) if factory is not None else Si7021(bus, addr, _keepOpen=True))
+	idx = dict(((bus, addr), i) for (i, addr) in slots)
+	# continue sequence & count of slots (worker may be restarted)
+	seqs = dict((i, COLL_SEQ.unpack_from(buf, _slot_offset(i))[0]) for (i, addr) in slots)
+	counts = dict((i, COLL_SLOT.unpack_from(buf, _slot_offset(i))[1]) for (i, addr) in slots)
+	try:
+		with Si7021Group(sensors) as g:
+			timer = PeriodTimer(period)
+			while not stop.is_set():
+				for (key, (ts, rc, tc, st)) in g.MeasRaw(timeout).items():
+					i = idx[key]
+					off = _slot_offset(i)
+					seq = seqs[i] + 1
+					counts[i] += 1
+					COLL_SEQ.pack_into(buf, off, seq)
+					COLL_SLOT.pack_into(buf, off, seq, counts[i], ts, rc, tc, st, key[0], key[1])
+					COLL_SEQ.pack_into(buf, off, seq + 1)
+					seqs[i] = seq + 1
+				stop.wait(timer.Next())
+	finally:
+		del buf
+		shm.close()
+
+
+class Si7021Collector:
+	def __init__(self, sensors, period=1.0, name=None, factory=None, timeout=None):
+		"""Initialize collector (nothing is started here, see Start).
+
+		Args:
+			sensors: list of (bus, addr), index in list is slot index in table
+			period(float): measurement period in seconds
+			name(str): shared memory name (random if None)
+			factory: picklable callable(bus, addr) -> Si7021 used by workers
+				(Si7021(bus, addr, _keepOpen=True) if None)
+			timeout(float): max. time of one bus measurement round [s] (see Si7021Group.MeasRaw),
+				period if None
+
+		Returns:
+			none
+		"""
+		self.sensors = [ (int(b), int(a)) for (b, a) in sensors ]
+		self.period = float(period)
+		self.timeout = self.period if timeout is None else float(timeout)
+		self.name = name
+		self.factory = factory
+		self.shm = None
+		self.table = None
+		self.buses = {} # bus -> slots [(i, addr)]
+		self.procs = {} # bus -> worker process
+		self.failures = {} # bus -> list of exit codes of dead workers
+		self.lock = threading.Lock()
+		self.watcher = None
+		self.stop = None
+
+	def __enter__(self):
+		self.Start()
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.Close()
+		return False
+
+	def Start(self):
+		"""Create result table and start one worker process per bus."""
+		if self.shm is not None:
+			return
+		n = len(self.sensors)
+		self.shm = shared_memory.SharedMemory(self.name, create=True, size=_slot_offset(n))
+		self.name = self.shm.name
+		_created.add(self.name)
+		COLL_HEADER.pack_into(self.shm.buf, 0, COLL_MAGIC, n)
+		for (i, (b, a)) in enumerate(self.sensors):
+			COLL_SLOT.pack_into(self.shm.buf, _slot_offset(i), 0, 0, 0.0, 0, 0, Si7021.SI7021_STATUS_NO_DATA, b, a)
+		self.table = Si7021Table(self.name, self.shm)
+		self.stop = multiprocessing.Event()
+		self.buses = {}
+		for (i, (b, a)) in enumerate(self.sensors):
+			self.buses.setdefault(b, []).append((i, a))
+		for b in self.buses:
+			self._spawn(b)
+		self.watcher = threading.Thread(target=self._watch, name="si7021-collector-watch", daemon=True)
+		self.watcher.start()
+
+	def _spawn(self, b):
+		p = multiprocessing.Process(target=_worker, name="si7021-bus{0}".format(b), args=(self.name, b, self.buses[b], self.period, self.timeout, self.stop, self.factory), daemon=True)
+		p.start()
+		self.procs[b] = p
+
+	def _watch(self):
+		# restart dead workers every period until stopped
+		while not self.stop.wait(self.period):
+			self.Check()
+
+	def Check(self):
+		"""Restart dead workers (called every period by watcher thread).
+
+		Args:
+
+		Returns:
+			dict: bus -> exit code of workers restarted now
+		"""
+		re = {}
+		with self.lock:
+			if (self.stop is None or self.stop.is_set()):
+				return re
+			for (b, p) in list(self.procs.items()):
+				if p.is_alive():
+					continue
+				p.join()
+				re[b] = p.exitcode
+				self.failures.setdefault(b, []).append(p.exitcode)
+				# worker is the only writer of its slots - fix slot left in the middle of update
+				for (i, a) in self.buses[b]:
+					off = _slot_offset(i)
+					seq = COLL_SEQ.unpack_from(self.shm.buf, off)[0]
+					if (seq & 1):
+						COLL_SEQ.pack_into(self.shm.buf, off, seq + 1)
+				self._spawn(b)
+		return re
+
+	def Workers(self):
+		"""Return dict bus -> worker exit code (None while it runs)."""
+		with self.lock:
+			return dict((b, p.exitcode) for (b, p) in self.procs.items())
+
+	def Stop(self):
+		"""Stop workers and wait for them to end (table stays readable)."""
+		if self.stop is not None:
+			self.stop.set()
+		if self.watcher is not None:
+			self.watcher.join()
+			self.watcher = None
+		with self.lock:
+			for p in self.procs.values():
+				p.join()
+			self.procs = {}
+
+	def Close(self):
+		"""Stop workers and remove result table."""
+		self.Stop()
+		if self.shm is not None:
+			self.table.Close()
+			self.table = None
+			self.shm.close()
+			self.shm.unlink()
+			_created.discard(self.name)
+			self.shm = None
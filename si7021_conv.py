@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Si7021 raw code conversion
+
+One place with datasheet formulas for converting 16bit RH & temperature codes:
+	RH[%]     = (125 * RH_Code / 65536) - 6
+	Temp[degC] = (175.72 * Temp_Code / 65536) - 46.85
+
+Single value functions work on plain ints. Bulk functions (*_codes) take any
+sequence of codes (list, array, memoryview, numpy array) and use NumPy when it
+is installed, otherwise fall back to pure Python lists.
+
+"centi" functions return ints in 0.01 units computed in exact integer fixed point,
+result is identical to int(round(value * 100)) used by Si7021 class from the start
+(incl. round half to even), but without float math.
+
+License:
+	MIT
+
+"""
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+def rh_from_code(code):
+	"""RH code -> relative humidity [%] (float)"""
+	return ((125*code)/65536) - 6
+
+def temp_from_code(code):
+	"""Temperature code -> temperature [degC] (float)"""
+	return ((175.72*code)/65536) - 46.85
+
+def _div_round(n):
+	# n / 65536 rounded half to even (same as round() does)
+	q = n >> 16
+	r = n & 0xFFFF
+	if (r > 0x8000 or (r == 0x8000 and (q & 1))):
+		q += 1
+	return q
+
+def rh_centi(code):
+	"""RH code -> relative humidity in 0.01% (int, exact fixed point)"""
+	return _div_round((12500*code) - (600*65536))
+
+def temp_centi(code):
+	"""Temperature code -> temperature in 0.01degC (int, exact fixed point)"""
+	return _div_round((17572*code) - (4685*65536))
+
+def _np_div_round(n):
+	q = n >> 16
+	r = n & 0xFFFF
+	q += (r > 0x8000) | ((r == 0x8000) & ((q & 1) == 1))
+	return q
+
+def rh_from_codes(codes):
+	"""Bulk rh_from_code.
+
+	Args:
+		codes: sequence of RH codes
+
+	Returns:
+		numpy.ndarray (float64) if NumPy is available, otherwise list of floats
+	"""
+	if numpy is not None:
+		return (numpy.asarray(codes, dtype=numpy.float64) * (125/65536)) - 6
+	return [ ((125*c)/65536) - 6 for c in codes ]
+
+def temp_from_codes(codes):
+	"""Bulk temp_from_code.
+
+	Args:
+		codes: sequence of temperature codes
+
+	Returns:
+		numpy.ndarray (float64) if NumPy is available, otherwise list of floats
+	"""
+	if numpy is not None:
+		return (numpy.asarray(codes, dtype=numpy.float64) * (175.72/65536)) - 46.85
+	return [ ((175.72*c)/65536) - 46.85 for c in codes ]
+
+def rh_centi_codes(codes):
+	"""Bulk rh_centi.
+
+	Args:
+		codes: sequence of RH codes
+
+	Returns:
+		numpy.ndarray (int64) if NumPy is available, otherwise list of ints
+	"""
+	if numpy is not None:
+		return _np_div_round((numpy.asarray(codes, dtype=numpy.int64) * 12500) - (600*65536))
+	return [ rh_centi(c) for c in codes ]
+
+def temp_centi_codes(codes):
+	"""Bulk temp_centi.
+
+	Args:
+		codes: sequence of temperature codes
+
+	Returns:
+		numpy.ndarray (int64) if NumPy is available, otherwise list of ints
+	"""
+	if numpy is not None:
+		return _np_div_round((numpy.asarray(codes, dtype=numpy.int64) * 17572) - (4685*65536))
+	return [ temp_centi(c) for c in codes ]
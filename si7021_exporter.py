@@ -0,0 +1,235 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Prometheus exporter for Si7021 sensors
+
+Background thread measures all sensors every 'period' seconds (heater settings
+every 'settings_period', identity once) and renders Prometheus text exposition
+into a snapshot. HTTP handler only sends the last snapshot, so scrape never
+touches the bus: it takes the same (microseconds) time for any number of sensors
+and concurrent scrapes don't start any conversion.
+
+Usage:
+	python3 si7021_exporter.py --sensor 1:0x40 --port 9721 --period 5
+
+Metrics (labels bus, addr):
+	si7021_up - 1 if last measurement succeeded
+	si7021_humidity_percent, si7021_temperature_celsius - last good sample
+	si7021_sample_timestamp_seconds - time of last good sample
+	si7021_heater_enabled, si7021_heater_current_milliamps - from ReadSettings
+	si7021_info - device, serial and firmware labels (from ReadSN), value 1
+	si7021_reads_total, si7021_bus_errors_total, si7021_crc_errors_total
+
+License:
+	MIT
+
+"""
+
+import sys
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from si7021 import Si7021
+from si7021_conv import rh_from_code, temp_from_code
+from si7021_sampler import PeriodTimer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (name, type, help)
+METRICS = (
+	('si7021_up', 'gauge', "1 if last measurement succeeded"),
+	('si7021_humidity_percent', 'gauge', "Relative humidity"),
+	('si7021_temperature_celsius', 'gauge', "Temperature"),
+	('si7021_sample_timestamp_seconds', 'gauge', "Unix time of last good sample"),
+	('si7021_heater_enabled', 'gauge', "Heater enabled (HTRE bit)"),
+	('si7021_heater_current_milliamps', 'gauge', "Heater current setting"),
+	('si7021_info', 'gauge', "Device identity"),
+	('si7021_reads_total', 'counter', "Measurements done"),
+	('si7021_bus_errors_total', 'counter', "Measurements failed on bus error"),
+	('si7021_crc_errors_total', 'counter', "CRC mismatches")
+	)
+
+
+class Si7021Exporter:
+	def __init__(self, sensors, period=5.0, settings_period=60.0, timeout=None):
+		"""Initialize exporter.
+
+		Args:
+			sensors: list of Si7021 instances (keep-open mode is recommended)
+			period(float): measurement period in seconds
+			settings_period(float): heater settings refresh period in seconds
+			timeout(float): max. time of one sensor measurement [s] (see Si7021.MeasRaw),
+				period / number of sensors if None
+
+		Returns:
+			none
+		"""
+		self.sensors = list(sensors)
+		self.period = float(period)
+		self.settingsPeriod = float(settings_period)
+		self.timeout = (self.period / max(1, len(self.sensors))) if timeout is None else float(timeout)
+		# per sensor state, touched only by sampling thread
+		self.state = [ { 'up': 0, 'ts': None, 'rh': None, 'temp': None, 'sett': None, 'sn': None, 'reads': 0, 'busErrors': 0, 'settTs': 0.0 } for s in self.sensors ]
+		self.snapshot = b""
+		self.stopEvt = threading.Event()
+		self.thread = None
+
+	def __enter__(self):
+		self.Start()
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.Stop()
+		return False
+
+	def Start(self):
+		"""Take first snapshot and start sampling thread."""
+		if self.thread is not None:
+			return
+		self.Update()
+		self.stopEvt.clear()
+		self.thread = threading.Thread(target=self._run, name="si7021-exporter", daemon=True)
+		self.thread.start()
+
+	def Stop(self):
+		"""Stop sampling thread and wait for it to end."""
+		if self.thread is None:
+			return
+		self.stopEvt.set()
+		self.thread.join()
+		self.thread = None
+
+	def _run(self):
+		timer = PeriodTimer(self.period)
+		while True:
+			if self.stopEvt.wait(timer.Next()):
+				return
+			self.Update()
+
+	def _sample(self, si, st):
+		(ts, rc, tc, status) = si.MeasRaw(self.timeout)
+		st['reads'] += 1
+		if (status == Si7021.SI7021_STATUS_OK):
+			st['up'] = 1
+			st['ts'] = ts
+			st['rh'] = rh_from_code(rc)
+			st['temp'] = temp_from_code(tc)
+		else:
+			st['up'] = 0
+			if (status == Si7021.SI7021_STATUS_BUS_ERR):
+				st['busErrors'] += 1
+		try:
+			if st['sn'] is None:
+				sn = si.ReadSN(cached=True)
+				if (sn['ok'] == 0):
+					st['sn'] = sn
+			now = time.monotonic()
+			if (st['sett'] is None or now - st['settTs'] >= self.settingsPeriod):
+				st['sett'] = si.ReadSettings()
+				st['settTs'] = now
+		except IOError:
+			st['busErrors'] += 1
+
+	def Update(self):
+		"""Measure all sensors now and replace snapshot."""
+		for (si, st) in zip(self.sensors, self.state):
+			self._sample(si, st)
+		# bytes object is swapped in one step, readers see old or new snapshot
+		self.snapshot = self.Render()
+
+	def Render(self):
+		"""Return Prometheus text exposition (bytes) of current state."""
+		vals = dict((m[0], []) for m in METRICS)
+		for (si, st) in zip(self.sensors, self.state):
+			lbl = 'bus="{0}",addr="0x{1:02X}"'.format(si.piBus, si.siAddr)
+			vals['si7021_up'].append((lbl, st['up']))
+			vals['si7021_reads_total'].append((lbl, st['reads']))
+			vals['si7021_bus_errors_total'].append((lbl, st['busErrors']))
+			vals['si7021_crc_errors_total'].append((lbl, si.CrcErrors))
+			if st['ts'] is not None:
+				vals['si7021_humidity_percent'].append((lbl, round(st['rh'], 3)))
+				vals['si7021_temperature_celsius'].append((lbl, round(st['temp'], 3)))
+				vals['si7021_sample_timestamp_seconds'].append((lbl, round(st['ts'], 3)))
+			if st['sett'] is not None:
+				vals['si7021_heater_enabled'].append((lbl, st['sett']['htre']))
+				vals['si7021_heater_current_milliamps'].append((lbl, round(st['sett']['heater_curr'] * 0.01, 2)))
+			if st['sn'] is not None:
+				sn = st['sn']
+				ilbl = '{0},device="{1}",serial="{2}",firmware="{3}"'.format(lbl, sn['device_str'], "".join("{0:02X}".format(b) for b in sn['sn']), sn['fw_str'])
+				vals['si7021_info'].append((ilbl, 1))
+		out = []
+		for (name, typ, hlp) in METRICS:
+			if not vals[name]:
+				continue
+			out.append("# HELP {0} {1}".format(name, hlp))
+			out.append("# TYPE {0} {1}".format(name, typ))
+			for (lbl, v) in vals[name]:
+				out.append("{0}{{{1}}} {2}".format(name, lbl, v))
+		out.append("")
+		return "\n".join(out).encode("utf-8")
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+	# set by serve()
+	exporter = None
+
+	def do_GET(self):
+		if (self.path.split('?')[0] not in ('/metrics', '/')):
+			self.send_error(404)
+			return
+		body = self.exporter.snapshot
+		self.send_response(200)
+		self.send_header("Content-Type", CONTENT_TYPE)
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		# no log line per scrape
+		pass
+
+def serve(exporter, host="", port=9721):
+	"""Start exporter and serve its snapshot over HTTP until interrupted."""
+	handler = type("Si7021MetricsHandler", (MetricsHandler,), { 'exporter': exporter })
+	httpd = ThreadingHTTPServer((host, port), handler)
+	with exporter:
+		try:
+			httpd.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			httpd.server_close()
+
+def parse_sensor(s):
+	"""'bus:addr' (addr decimal or 0x hex, default 0x40) -> (bus, addr)"""
+	(bus, _, addr) = s.partition(':')
+	return (int(bus), int(addr, 0) if addr else Si7021.SI7021_DEF_ADDR)
+
+def main(argv=None):
+	ap = argparse.ArgumentParser(description="Prometheus exporter for Si7021 sensors")
+	ap.add_argument("--sensor", action="append", type=parse_sensor, metavar="BUS[:ADDR]", help="sensor to export (repeatable, default 1:0x40)")
+	ap.add_argument("--host", default="", help="listen address (default all)")
+	ap.add_argument("--port", type=int, default=9721, help="listen port (default 9721)")
+	ap.add_argument("--period", type=float, default=5.0, help="measurement period [s]")
+	ap.add_argument("--settings-period", type=float, default=60.0, help="heater settings refresh period [s]")
+	ap.add_argument("--timeout", type=float, help="max. time of one sensor measurement [s] (default period / sensors)")
+	ap.add_argument("--sim", action="store_true", help="use simulated chips (si7021_sim) instead of hardware")
+	args = ap.parse_args(argv)
+	sensors = []
+	for (bus, addr) in (args.sensor or [(1, Si7021.SI7021_DEF_ADDR)]):
+		if args.sim:
+			from si7021_bus import MemoryBus
+			from si7021_sim import SimSi7021
+			si = Si7021(bus, addr, _keepOpen=True, _transport=MemoryBus(SimSi7021()))
+		else:
+			si = Si7021(bus, addr, _keepOpen=True)
+		sensors.append(si)
+	serve(Si7021Exporter(sensors, args.period, args.settings_period, args.timeout), args.host, args.port)
+	for si in sensors:
+		si.Close()
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
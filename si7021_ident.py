@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""On-disk cache of Si7021 identity
+
+IdentityCache keeps ReadSN() result (serial number, device, firmware) per bus and
+address in small JSON file, so application start don't need to read electronic ID
+of chips it already knows. Entry older than 'max_age' seconds is treated as
+missing, so Si7021.ReadSN(cached=True) reads chip again and refresh the entry.
+File is written only when entry changes (new identity or refresh of expired one)
+and write failure (e.g. read-only directory) is ignored - entry is kept in memory.
+
+Example:
+	si.IdCache = IdentityCache("/var/cache/si7021-id.json")
+	sn = si.ReadSN(cached=True)
+
+License:
+	MIT
+
+"""
+
+import os
+import json
+import time
+
+
+class IdentityCache:
+	def __init__(self, path, max_age=86400.0):
+		"""Initialize cache, file is read on first access.
+
+		Args:
+			path: JSON file path
+			max_age(float): entry lifetime in seconds
+
+		Returns:
+			none
+		"""
+		self.path = path
+		self.maxAge = float(max_age)
+		self.entries = None
+
+	def _load(self):
+		if self.entries is None:
+			try:
+				with open(self.path, "r") as f:
+					self.entries = json.load(f)
+			except (OSError, ValueError):
+				self.entries = {}
+		return self.entries
+
+	def _save(self):
+		# write to temp. file and rename, so readers never see half written file;
+		# cache is optional - unwritable file only costs chip read in next process
+		tmp = "{0}.{1}.tmp".format(self.path, os.getpid())
+		try:
+			with open(tmp, "w") as f:
+				json.dump(self.entries, f)
+			os.replace(tmp, self.path)
+		except OSError:
+			try:
+				os.remove(tmp)
+			except OSError:
+				pass
+
+	def _key(self, bus, addr):
+		return "{0}:0x{1:02X}".format(bus, addr)
+
+	def Get(self, bus, addr):
+		"""Return cached ReadSN() dict for device or None (missing or expired).
+
+		Args:
+			bus(int): I2C bus number
+			addr(int): I2C address
+
+		Returns:
+			dict - same as Si7021.ReadSN() or None
+		"""
+		e = self._load().get(self._key(bus, addr))
+		if (e is None or (time.time() - e.get('checked', 0)) > self.maxAge):
+			return None
+		re = dict(e)
+		del re['checked']
+		return re
+
+	def Put(self, bus, addr, sn):
+		"""Store ReadSN() result of device.
+		File is written only if stored entry differs or is expired.
+
+		Args:
+			bus(int): I2C bus number
+			addr(int): I2C address
+			sn(dict): Si7021.ReadSN() result
+
+		Returns:
+
+		"""
+		e = dict(sn)
+		key = self._key(bus, addr)
+		old = self._load().get(key)
+		if (old is not None and (time.time() - old.get('checked', 0)) <= self.maxAge):
+			old = dict(old)
+			del old['checked']
+			if (old == e):
+				return
+		e['checked'] = time.time()
+		self.entries[key] = e
+		self._save()
+		return
+
+	def Invalidate(self, bus, addr):
+		"""Remove device entry.
+
+		Args:
+			bus(int): I2C bus number
+			addr(int): I2C address
+
+		Returns:
+
+		"""
+		if (self._load().pop(self._key(bus, addr), None) is not None):
+			self._save()
+		return
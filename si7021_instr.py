@@ -0,0 +1,268 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Instrumentation of Si7021 operations
+
+Si7021Instruments.Attach(si) shadows public operations of one Si7021 instance
+(MeasHumi, ReadSN, SetHeater, ...) with timing wrappers and wraps its transport,
+so for every operation it records:
+	total latency, time spent in bus transactions and the rest (conversion waits)
+	into log-scale histograms
+and counts events:
+	crc_error - measurement result CRC mismatch
+	short_read - bus returned less bytes than requested
+	bus_error - failed bus transaction (incl. NACKs while polling for conversion end)
+	retry - measurement repeated (CRC) or result read retried (SI7021_WAIT_POLL)
+	verify_fail - register read back after SetHeater/SetSampling/ApplyConfig don't match
+	hold_fail - HOLD MASTER measurement failed and was done in NO HOLD mode
+	error - operation raised exception
+Hooks (callables hook(kind, op, value)) get every event: kind is 'op' with value
+(total, bus) in seconds, or counter name with value 1.
+Detach(si) removes everything again - instance without instruments runs the same
+code as before (counters in Si7021 are only behind 'self.Instr is not None' on
+error paths), so disabled instrumentation costs nothing.
+One Si7021Instruments can be attached to many sensors, statistics are summed.
+
+Example:
+	ins = Si7021Instruments()
+	ins.Attach(si)
+	...
+	print(ins.Result())
+
+License:
+	MIT
+
+"""
+
+import time
+import bisect
+import threading
+
+# operations timed by Attach()
+INSTR_OPS = (
+	'MeasHumi', 'MeasTemp', 'MeasHumiTemp', 'MeasHumiTempInto', 'MeasHumiTempRaw', 'MeasRaw', 'GetLastMeasHumiTemp',
+	'StartHumiTemp', 'FetchHumiTemp', 'FetchHumiTempRaw', 'ReadSN', 'ReadSettings', 'SetHeater', 'SetSampling', 'ApplyConfig', 'Reset'
+	)
+
+# histogram bucket upper bounds [s]: 25us * 2^k up to ~1.6s, last bucket is +Inf
+HIST_BOUNDS = tuple(0.000025 * (2 ** k) for k in range(17))
+
+COUNTERS = ('crc_error', 'short_read', 'bus_error', 'retry', 'verify_fail', 'hold_fail', 'error')
+
+
+class LatencyHistogram:
+	def __init__(self, bounds=HIST_BOUNDS):
+		"""Initialize histogram.
+
+		Args:
+			bounds: sorted bucket upper bounds in seconds (values above last one go to extra bucket)
+
+		Returns:
+			none
+		"""
+		self.bounds = bounds
+		self.counts = [0] * (len(bounds) + 1)
+		self.n = 0
+		self.sum = 0.0
+		self.max = 0.0
+
+	def add(self, v):
+		self.counts[bisect.bisect_left(self.bounds, v)] += 1
+		self.n += 1
+		self.sum += v
+		if (v > self.max):
+			self.max = v
+
+	def percentile(self, p):
+		"""Return upper bound of bucket with p-th percentile (0..100), max for the last bucket."""
+		if (self.n == 0):
+			return 0.0
+		k = (p / 100.0) * self.n
+		acc = 0
+		for (i, c) in enumerate(self.counts):
+			acc += c
+			if (acc >= k and c):
+				return self.bounds[i] if i < len(self.bounds) else self.max
+		return self.max
+
+	def Result(self):
+		"""Return dict with fields n, mean, p50, p99, max [s] and buckets (list of (upper bound, count))."""
+		return {
+			'n': self.n,
+			'mean': self.sum / self.n if self.n else 0.0,
+			'p50': self.percentile(50),
+			'p99': self.percentile(99),
+			'max': self.max,
+			'buckets': list(zip(self.bounds + (float('inf'),), self.counts))
+			}
+
+
+class InstrumentedBus:
+	def __init__(self, bus, instr):
+		"""Transport wrapper timing every transaction (see si7021_bus for interface).
+
+		Args:
+			bus: wrapped transport
+			instr: Si7021Instruments
+
+		Returns:
+			none
+		"""
+		self.bus = bus
+		self.instr = instr
+
+	def __getattr__(self, name):
+		# anything not timed (calls, pigpio, connect, lock...) goes to wrapped transport
+		return getattr(self.bus, name)
+
+	def _call(self, fn, *args):
+		t = time.perf_counter()
+		try:
+			return fn(*args)
+		except IOError:
+			self.instr.count('bus_error')
+			raise
+		finally:
+			self.instr.busTime(time.perf_counter() - t)
+
+	def stop(self):
+		self.bus.stop()
+
+	def open(self):
+		return self._call(self.bus.open)
+
+	def close(self, h):
+		self._call(self.bus.close, h)
+
+	def write_byte(self, h, b):
+		self._call(self.bus.write_byte, h, b)
+
+	def read_device(self, h, n):
+		re = self._call(self.bus.read_device, h, n)
+		if (len(re) < n):
+			self.instr.count('short_read')
+		return re
+
+	def read_byte_data(self, h, reg):
+		return self._call(self.bus.read_byte_data, h, reg)
+
+	def write_byte_data(self, h, reg, val):
+		self._call(self.bus.write_byte_data, h, reg, val)
+
+	def transfer(self, h, msgs, combined=False):
+		re = self._call(self.bus.transfer, h, msgs, combined)
+		if (len(re) < sum(arg for (op, arg) in msgs if op == 'r')):
+			self.instr.count('short_read')
+		return re
+
+
+class Si7021Instruments:
+	def __init__(self, bounds=HIST_BOUNDS):
+		"""Initialize empty statistics.
+
+		Args:
+			bounds: latency histogram bucket upper bounds [s]
+
+		Returns:
+			none
+		"""
+		self.bounds = bounds
+		self.lock = threading.Lock()
+		self.ops = {} # op -> (total, bus, wait) histograms
+		self.counters = dict((c, 0) for c in COUNTERS)
+		self.opCounters = {} # (counter, op) -> count
+		self.hooks = []
+		# per thread: [depth, op, bus time of running op]
+		self.local = threading.local()
+
+	def AddHook(self, fn):
+		"""Call fn(kind, op, value) on every event (see module doc)."""
+		self.hooks.append(fn)
+
+	def _state(self):
+		st = getattr(self.local, 'st', None)
+		if st is None:
+			st = self.local.st = [0, None, 0.0]
+		return st
+
+	def busTime(self, t):
+		self._state()[2] += t
+
+	def count(self, name, op=None):
+		"""Count event 'name' (of operation 'op', running operation if None)."""
+		if op is None:
+			op = self._state()[1]
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + 1
+			self.opCounters[(name, op)] = self.opCounters.get((name, op), 0) + 1
+		for h in self.hooks:
+			h(name, op, 1)
+
+	def _record(self, op, total, bus):
+		with self.lock:
+			hs = self.ops.get(op)
+			if hs is None:
+				hs = self.ops[op] = (LatencyHistogram(self.bounds), LatencyHistogram(self.bounds), LatencyHistogram(self.bounds))
+			hs[0].add(total)
+			hs[1].add(bus)
+			hs[2].add(max(0.0, total - bus))
+		for h in self.hooks:
+			h('op', op, (total, bus))
+
+	def wrap(self, op, fn):
+		"""Return timing wrapper of callable fn (nested operations are counted in the outer one)."""
+		def timed(*args, **kw):
+			st = self._state()
+			if (st[0] > 0):
+				return fn(*args, **kw)
+			st[0] = 1
+			st[1] = op
+			st[2] = 0.0
+			t = time.perf_counter()
+			try:
+				return fn(*args, **kw)
+			except Exception:
+				self.count('error', op)
+				raise
+			finally:
+				total = time.perf_counter() - t
+				st[0] = 0
+				st[1] = None
+				self._record(op, total, st[2])
+		return timed
+
+	def Attach(self, si):
+		"""Instrument Si7021 instance 'si' (its operations and transport)."""
+		if si.Instr is not None:
+			si.Instr.Detach(si)
+		si.Instr = self
+		si.i2c = InstrumentedBus(si.i2c, self)
+		for op in INSTR_OPS:
+			setattr(si, op, self.wrap(op, getattr(si, op)))
+
+	def Detach(self, si):
+		"""Remove instruments from 'si'."""
+		if si.Instr is not self:
+			return
+		for op in INSTR_OPS:
+			si.__dict__.pop(op, None)
+		si.i2c = si.i2c.bus
+		si.Instr = None
+
+	def Result(self):
+		"""Return statistics.
+
+		Args:
+
+		Returns:
+			dict with fields:
+				ops(dict): op -> dict with 'total', 'bus', 'wait' LatencyHistogram.Result() dicts
+				counters(dict): counter -> count
+				op_counters(dict): op -> dict counter -> count
+		"""
+		with self.lock:
+			ops = dict((op, { 'total': hs[0].Result(), 'bus': hs[1].Result(), 'wait': hs[2].Result() }) for (op, hs) in self.ops.items())
+			oc = {}
+			for ((name, op), n) in self.opCounters.items():
+				oc.setdefault(op, {})[name] = n
+			return { 'ops': ops, 'counters': dict(self.counters), 'op_counters': oc }
@@ -0,0 +1,238 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Derived psychrometric values from Si7021 readings
+
+All functions take RH and temperature in 0.01 units, exactly as Si7021.MeasHumiTemp
+returns them ("humi" 0.01%, "temp" 0.01degC), and return floats:
+	sat_pressure - saturation vapour pressure over water [hPa] (Magnus formula)
+	dew_point - dew point [degC]
+	abs_humidity - absolute humidity [g/m3]
+	mixing_ratio - mixing ratio [g/kg] for given air pressure
+	heat_index - heat index [degC] (NWS / Rothfusz regression)
+Arguments can be single values or sequences (list, array, numpy array). Sequences
+are computed by NumPy when it is installed (result is numpy.ndarray), otherwise
+value by value (result is list).
+RH is clipped to 0.01..100% (chip can report values slightly out of range).
+
+Most of the time goes to exp() of saturation pressure. SatPressureTable precomputes
+it for every integer 0.01degC temperature the chip can report, functions use it
+when passed as 'table' and temperature is integer (ints / integer numpy arrays).
+
+Example:
+	tbl = SatPressureTable()
+	m = si.MeasHumiTemp()
+	print(dew_point(m['humi'], m['temp'], tbl))
+
+License:
+	MIT
+
+"""
+
+import math
+from array import array
+from si7021_conv import temp_centi
+
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
+# Magnus formula over water (Sonntag 1990): es = A * exp(B*t / (C+t)) [hPa]
+MAGNUS_A = 6.112
+MAGNUS_B = 17.62
+MAGNUS_C = 243.12
+# water vapour gas constant [J/(kg*K)]
+RV = 461.5
+# molar mass ratio water vapour / dry air
+EPSILON = 0.62198
+# standard sea level pressure [hPa]
+P_STD = 1013.25
+
+
+class SatPressureTable:
+	def __init__(self, tmin=temp_centi(0), tmax=temp_centi(0xFFFF)):
+		"""Precompute saturation pressure for every temperature tmin..tmax in 0.01degC.
+		Default range covers all codes of the chip (about 140kB).
+
+		Args:
+			tmin(int): lowest temperature [0.01degC]
+			tmax(int): highest temperature [0.01degC]
+
+		Returns:
+			none
+		"""
+		self.tmin = int(tmin)
+		self.tmax = int(tmax)
+		if numpy is not None:
+			t = numpy.arange(self.tmin, self.tmax + 1) / 100.0
+			self.npEs = MAGNUS_A * numpy.exp((MAGNUS_B * t) / (MAGNUS_C + t))
+			# single value lookups are faster from plain array than from ndarray
+			self.es = array('d', self.npEs.tobytes())
+		else:
+			self.npEs = None
+			self.es = array('d', [ _es(c / 100.0) for c in range(self.tmin, self.tmax + 1) ])
+
+def _is_bulk(x):
+	return hasattr(x, '__len__')
+
+def _es(t):
+	return MAGNUS_A * math.exp((MAGNUS_B * t) / (MAGNUS_C + t))
+
+def sat_pressure(temp, table=None):
+	"""Saturation vapour pressure over water.
+
+	Args:
+		temp: temperature [0.01degC] (value or sequence)
+		table: SatPressureTable (used for integer temperatures in its range)
+
+	Returns:
+		float [hPa], numpy.ndarray or list for sequence
+	"""
+	if _is_bulk(temp):
+		if numpy is None:
+			return [ sat_pressure(t, table) for t in temp ]
+		t = numpy.asarray(temp)
+		if (table is not None and table.npEs is not None and t.dtype.kind in 'iu' and t.size and t.min() >= table.tmin and t.max() <= table.tmax):
+			return table.npEs[t - table.tmin]
+		t = t / 100.0
+		return MAGNUS_A * numpy.exp((MAGNUS_B * t) / (MAGNUS_C + t))
+	if (table is not None and isinstance(temp, int) and table.tmin <= temp <= table.tmax):
+		return table.es[temp - table.tmin]
+	return _es(temp / 100.0)
+
+def _vapour(humi, temp, table):
+	# -> (RH fraction, saturation pressure [hPa]) for single value
+	return (min(max(humi, 1), 10000) / 10000.0, sat_pressure(temp, table))
+
+def _np_vapour(humi, temp, table):
+	return (numpy.clip(numpy.asarray(humi, dtype=numpy.float64), 1, 10000) / 10000.0, sat_pressure(temp, table))
+
+def dew_point(humi, temp, table=None):
+	"""Dew point (Magnus formula).
+
+	Args:
+		humi: relative humidity [0.01%] (value or sequence)
+		temp: temperature [0.01degC] (value or sequence)
+		table: SatPressureTable or None
+
+	Returns:
+		float [degC], numpy.ndarray or list for sequences
+	"""
+	if _is_bulk(humi):
+		if numpy is None:
+			return [ dew_point(h, t, table) for (h, t) in zip(humi, temp) ]
+		(rh, es) = _np_vapour(humi, temp, table)
+		g = numpy.log((rh * es) / MAGNUS_A)
+	else:
+		(rh, es) = _vapour(humi, temp, table)
+		g = math.log((rh * es) / MAGNUS_A)
+	return (MAGNUS_C * g) / (MAGNUS_B - g)
+
+def abs_humidity(humi, temp, table=None):
+	"""Absolute humidity (water vapour density).
+
+	Args:
+		humi: relative humidity [0.01%] (value or sequence)
+		temp: temperature [0.01degC] (value or sequence)
+		table: SatPressureTable or None
+
+	Returns:
+		float [g/m3], numpy.ndarray or list for sequences
+	"""
+	if _is_bulk(humi):
+		if numpy is None:
+			return [ abs_humidity(h, t, table) for (h, t) in zip(humi, temp) ]
+		(rh, es) = _np_vapour(humi, temp, table)
+		k = (numpy.asarray(temp) / 100.0) + 273.15
+	else:
+		(rh, es) = _vapour(humi, temp, table)
+		k = (temp / 100.0) + 273.15
+	# e[hPa]*100 -> Pa, kg -> g
+	return (rh * es * 1.0e5) / (RV * k)
+
+def mixing_ratio(humi, temp, pressure=P_STD, table=None):
+	"""Mixing ratio (mass of water vapour per mass of dry air).
+
+	Args:
+		humi: relative humidity [0.01%] (value or sequence)
+		temp: temperature [0.01degC] (value or sequence)
+		pressure: air pressure [hPa] (value or sequence)
+		table: SatPressureTable or None
+
+	Returns:
+		float [g/kg], numpy.ndarray or list for sequences
+	"""
+	if _is_bulk(humi):
+		if numpy is None:
+			if not _is_bulk(pressure):
+				pressure = [pressure] * len(humi)
+			return [ mixing_ratio(h, t, p, table) for (h, t, p) in zip(humi, temp, pressure) ]
+		(rh, es) = _np_vapour(humi, temp, table)
+		pressure = numpy.asarray(pressure, dtype=numpy.float64)
+	else:
+		(rh, es) = _vapour(humi, temp, table)
+	e = rh * es
+	return (1000.0 * EPSILON * e) / (pressure - e)
+
+def _heat_index_f(t, rh):
+	# NWS heat index, t [degF], rh [%]
+	hi = 0.5 * (t + 61.0 + ((t - 68.0) * 1.2) + (rh * 0.094))
+	if ((hi + t) / 2.0 < 80.0):
+		return hi
+	hi = (-42.379 + (2.04901523 * t) + (10.14333127 * rh) - (0.22475541 * t * rh) - (0.00683783 * t * t)
+		- (0.05481717 * rh * rh) + (0.00122874 * t * t * rh) + (0.00085282 * t * rh * rh) - (0.00000199 * t * t * rh * rh))
+	if (rh < 13.0 and 80.0 <= t <= 112.0):
+		hi -= ((13.0 - rh) / 4.0) * math.sqrt((17.0 - abs(t - 95.0)) / 17.0)
+	elif (rh > 85.0 and 80.0 <= t <= 87.0):
+		hi += ((rh - 85.0) / 10.0) * ((87.0 - t) / 5.0)
+	return hi
+
+def _np_heat_index_f(t, rh):
+	simple = 0.5 * (t + 61.0 + ((t - 68.0) * 1.2) + (rh * 0.094))
+	hi = (-42.379 + (2.04901523 * t) + (10.14333127 * rh) - (0.22475541 * t * rh) - (0.00683783 * t * t)
+		- (0.05481717 * rh * rh) + (0.00122874 * t * t * rh) + (0.00085282 * t * rh * rh) - (0.00000199 * t * t * rh * rh))
+	dry = (rh < 13.0) & (t >= 80.0) & (t <= 112.0)
+	hi -= numpy.where(dry, ((13.0 - rh) / 4.0) * numpy.sqrt(numpy.clip(17.0 - numpy.abs(t - 95.0), 0, None) / 17.0), 0.0)
+	wet = (rh > 85.0) & (t >= 80.0) & (t <= 87.0)
+	hi += numpy.where(wet, ((rh - 85.0) / 10.0) * ((87.0 - t) / 5.0), 0.0)
+	return numpy.where(((simple + t) / 2.0) < 80.0, simple, hi)
+
+def heat_index(humi, temp):
+	"""Heat index (apparent temperature, NWS algorithm).
+
+	Args:
+		humi: relative humidity [0.01%] (value or sequence)
+		temp: temperature [0.01degC] (value or sequence)
+
+	Returns:
+		float [degC], numpy.ndarray or list for sequences
+	"""
+	if _is_bulk(humi):
+		if numpy is None:
+			return [ heat_index(h, t) for (h, t) in zip(humi, temp) ]
+		rh = numpy.clip(numpy.asarray(humi, dtype=numpy.float64), 1, 10000) / 100.0
+		tf = ((numpy.asarray(temp, dtype=numpy.float64) / 100.0) * 1.8) + 32.0
+		return (_np_heat_index_f(tf, rh) - 32.0) / 1.8
+	rh = min(max(humi, 1), 10000) / 100.0
+	tf = ((temp / 100.0) * 1.8) + 32.0
+	return (_heat_index_f(tf, rh) - 32.0) / 1.8
+
+def derived(meas, pressure=P_STD, table=None):
+	"""All derived values of one Si7021.MeasHumiTemp() result.
+
+	Args:
+		meas(dict): dict with "humi" and "temp" (values or sequences)
+		pressure: air pressure [hPa]
+		table: SatPressureTable or None
+
+	Returns:
+		dict with fields dew_point, abs_humidity, mixing_ratio, heat_index
+	"""
+	(h, t) = (meas["humi"], meas["temp"])
+	return {
+		"dew_point": dew_point(h, t, table),
+		"abs_humidity": abs_humidity(h, t, table),
+		"mixing_ratio": mixing_ratio(h, t, pressure, table),
+		"heat_index": heat_index(h, t)
+		}
@@ -0,0 +1,122 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Compact binary storage of raw Si7021 samples
+
+File layout (little endian):
+	header - 8 bytes: magic b"SI7021R" + format version (1)
+	records - 13 bytes each: timestamp (double), rh_code (uint16), temp_code (uint16), status (uint8)
+
+RawWriter appends records (can be used as Si7021.RawSink), RawReader maps file
+into memory and decode record only when it is accessed. Codes can be converted
+later with si7021_conv bulk functions.
+
+License:
+	MIT
+
+"""
+
+import os
+import mmap
+import struct
+
+RAW_MAGIC = b"SI7021R\x01"
+RAW_RECORD = struct.Struct("<dHHB")
+
+try:
+	import numpy
+	RAW_DTYPE = numpy.dtype([('ts', '<f8'), ('rh', '<u2'), ('temp', '<u2'), ('status', 'u1')])
+except ImportError:
+	numpy = None
+	RAW_DTYPE = None
+
+
+class RawWriter:
+	def __init__(self, path):
+		"""Open raw samples file for appending (header is written to new/empty file).
+
+		Args:
+			path: file path
+
+		Returns:
+			none
+		"""
+		self.f = open(path, "ab")
+		if (self.f.tell() == 0):
+			self.f.write(RAW_MAGIC)
+		self.pack = RAW_RECORD.pack
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+		return False
+
+	def write(self, ts, rh_code, temp_code, status):
+		"""Append one sample."""
+		self.f.write(self.pack(ts, rh_code, temp_code, status))
+
+	def flush(self):
+		self.f.flush()
+
+	def close(self):
+		self.f.close()
+
+
+class RawReader:
+	def __init__(self, path):
+		"""Map raw samples file into memory (read only).
+
+		Args:
+			path: file path
+
+		Returns:
+			none
+		"""
+		with open(path, "rb") as f:
+			if (f.read(len(RAW_MAGIC)) != RAW_MAGIC):
+				raise ValueError("{0}: not a Si7021 raw samples file".format(path))
+			size = os.fstat(f.fileno()).st_size
+			self.mm = None
+			if (size > len(RAW_MAGIC)):
+				self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		# incomplete record at the end (writer still running) is ignored
+		self.n = (size - len(RAW_MAGIC)) // RAW_RECORD.size
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.close()
+		return False
+
+	def __len__(self):
+		return self.n
+
+	def __getitem__(self, i):
+		"""Return sample 'i' as tuple (timestamp, rh_code, temp_code, status)."""
+		if (i < 0):
+			i += self.n
+		if (i < 0 or i >= self.n):
+			raise IndexError("sample index out of range")
+		return RAW_RECORD.unpack_from(self.mm, len(RAW_MAGIC) + (i * RAW_RECORD.size))
+
+	def __iter__(self):
+		for i in range(self.n):
+			yield RAW_RECORD.unpack_from(self.mm, len(RAW_MAGIC) + (i * RAW_RECORD.size))
+
+	def array(self):
+		"""Return all samples as NumPy structured array (fields ts, rh, temp, status)
+		backed directly by mapped file (no copy). Needs NumPy.
+		"""
+		if numpy is None:
+			raise RuntimeError("NumPy is not installed")
+		if (self.n == 0):
+			return numpy.zeros(0, dtype=RAW_DTYPE)
+		return numpy.frombuffer(self.mm, dtype=RAW_DTYPE, count=self.n, offset=len(RAW_MAGIC))
+
+	def close(self):
+		if self.mm is not None:
+			self.mm.close()
+			self.mm = None
@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Background sampler for Si7021
+
+Si7021Sampler measures RH & temperature in its own thread with fixed period and
+keeps timestamped raw codes in ring buffer made of preallocated arrays, so
+memory usage don't grow no matter how long it runs.
+Readers never touch the bus: Latest() returns last sample, Window(n) returns
+memoryview slices of the ring (no copy).
+
+License:
+	MIT
+
+"""
+
+import time
+import threading
+from array import array
+from si7021 import Si7021
+
+
+class PeriodTimer:
+	def __init__(self, period):
+		"""Fixed rate timer for sampling loops (period counted from creation).
+
+		Args:
+			period(float): period in seconds
+
+		Returns:
+			none
+		"""
+		self.period = float(period)
+		self.nxt = time.monotonic()
+
+	def Next(self):
+		"""Return delay [s] until start of next period."""
+		self.nxt += self.period
+		delay = self.nxt - time.monotonic()
+		if (delay < 0):
+			# late - skip missed periods instead of bursting
+			self.nxt = time.monotonic()
+			delay = 0
+		return delay
+
+
+class Si7021Sampler:
+	# Constans - sample status (same as Si7021.MeasRaw status)
+	SAMPLE_OK=Si7021.SI7021_STATUS_OK
+	SAMPLE_CRC_ERR=Si7021.SI7021_STATUS_CRC_ERR
+	SAMPLE_BUS_ERR=Si7021.SI7021_STATUS_BUS_ERR
+
+	def __init__(self, si, period=1.0, size=1024, timeout=None):
+		"""Initialize sampler.
+
+		Args:
+			si: Si7021 instance to sample (keep-open mode is recommended)
+			period(float): sampling period in seconds
+			size(int): ring buffer length in samples
+			timeout(float): max. time of one measurement [s] (see Si7021.MeasRaw), period if None,
+				so failing sensor can't stall sampling
+
+		Returns:
+			none
+		"""
+		self.si = si
+		self.period = float(period)
+		self.size = int(size)
+		self.timeout = self.period if timeout is None else float(timeout)
+		self.ts = array('d', [0.0]) * self.size
+		self.rh = array('H', [0]) * self.size
+		self.temp = array('H', [0]) * self.size
+		self.status = array('B', [0]) * self.size
+		self.mv = (memoryview(self.ts), memoryview(self.rh), memoryview(self.temp), memoryview(self.status))
+		self.count = 0 # samples written since start (next slot is count % size)
+		self.errors = 0 # bus errors
+		self.crcErrors = 0
+		self.stopEvt = threading.Event()
+		self.thread = None
+
+	def __enter__(self):
+		self.Start()
+		return self
+
+	def __exit__(self, exc_type, exc_val, exc_tb):
+		self.Stop()
+		return False
+
+	def Start(self):
+		"""Start sampling thread.
+
+		Args:
+
+		Returns:
+
+		"""
+		if self.thread is not None:
+			return
+		self.stopEvt.clear()
+		self.thread = threading.Thread(target=self._run, name="si7021-sampler", daemon=True)
+		self.thread.start()
+		return
+
+	def Stop(self):
+		"""Stop sampling thread and wait for it to end.
+
+		Args:
+
+		Returns:
+
+		"""
+		if self.thread is None:
+			return
+		self.stopEvt.set()
+		self.thread.join()
+		self.thread = None
+		return
+
+	def _run(self):
+		timer = PeriodTimer(self.period)
+		while not self.stopEvt.is_set():
+			(ts, rc, tc, st) = self.si.MeasRaw(self.timeout)
+			if (st == self.SAMPLE_CRC_ERR):
+				self.crcErrors += 1
+			elif (st == self.SAMPLE_BUS_ERR):
+				self.errors += 1
+			i = self.count % self.size
+			self.ts[i] = ts
+			self.rh[i] = rc
+			self.temp[i] = tc
+			self.status[i] = st
+			# publish sample
+			self.count += 1
+			self.stopEvt.wait(timer.Next())
+
+	def Latest(self):
+		"""Return last sample without touching the bus.
+
+		Args:
+
+		Returns:
+			tuple (timestamp(float), rh_code(int), temp_code(int), status(int)) or None if no sample yet
+		"""
+		while True:
+			n = self.count
+			if (n == 0):
+				return None
+			i = (n-1) % self.size
+			re = (self.ts[i], self.rh[i], self.temp[i], self.status[i])
+			# slot could be overwritten only if writer went around whole ring meanwhile
+			if (self.count < n + self.size - 1):
+				return re
+
+	def Window(self, n):
+		"""Return last 'n' samples (or less if not available) as views into ring buffer.
+		Views are not copied, so they show new data after ring wraps around them.
+
+		Args:
+			n(int): number of samples
+
+		Returns:
+			list of 1 or 2 segments (oldest first), each is tuple of memoryviews:
+			(timestamps, rh_codes, temp_codes, statuses)
+		"""
+		cnt = self.count
+		n = min(n, cnt, self.size)
+		end = cnt % self.size
+		start = end - n
+		if (start >= 0):
+			return [ tuple(v[start:end] for v in self.mv) ]
+		return [ tuple(v[start+self.size:] for v in self.mv), tuple(v[:end] for v in self.mv) ]
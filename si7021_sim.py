@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Simulated Si7021
+
+SimSi7021 is software model of Si7021 chip for si7021_bus.MemoryBus, so Si7021
+class (and everything built on it) can run without hardware and without pigpio.
+Model follows datasheet command set (SI7021_CMD_* constants):
+	* RH/Temp measurement in HOLD (read waits for conversion) and NO HOLD mode
+	  (read is NACKed until conversion is done), conversion time depends on resolution
+	* read temperature of last RH measurement (0xE0)
+	* user and heater registers (write/read), reset
+	* electronic ID (both parts, with valid CRC) and firmware revision
+Extras for testing: per message bus latency and fault injection (NACK, wrong CRC,
+short read) with own random generator (seed).
+
+Example:
+	from si7021 import Si7021
+	from si7021_bus import MemoryBus
+	from si7021_sim import SimSi7021
+	si = Si7021(1, _transport=MemoryBus(SimSi7021(humi=45.0, temp=21.5)))
+
+License:
+	MIT
+
+"""
+
+import time
+import random
+from si7021 import Si7021, crc8
+from si7021_bus import Si7021BusError
+
+# typical conversion time [s] for resolution [bits] (datasheet Table 2)
+SIM_CONV_TIME_HUMI = { 12: 0.010, 11: 0.0058, 10: 0.0037, 8: 0.0026 }
+SIM_CONV_TIME_TEMP = { 14: 0.007, 13: 0.004, 12: 0.0024, 11: 0.0015 }
+
+
+class SimSi7021:
+	def __init__(self, humi=50.0, temp=25.0, sn=(0x01, 0x02, 0x03, 0x04, 0x15, 0xFF, 0xB5, 0xFF), fw=0x20,
+			latency=0.0, conv_scale=1.0, nack_rate=0.0, crc_error_rate=0.0, short_read_rate=0.0, seed=None, stretch=True):
+		"""Initialize simulated chip.
+
+		Args:
+			humi(float): simulated relative humidity [%]
+			temp(float): simulated temperature [degC]
+			sn: 8 bytes of serial number (SNA_3..SNA_0, SNB_3..SNB_0), SNB_3 is device id
+			fw(int): firmware revision byte
+			latency(float): extra delay [s] of every bus message
+			conv_scale(float): conversion time multiplier (0 = instant conversion)
+			nack_rate(float): probability of NACK for any message
+			crc_error_rate(float): probability of corrupted CRC byte in measurement result
+			short_read_rate(float): probability that read returns less bytes than requested
+			seed: random generator seed for fault injection
+			stretch(bool): bus supports clock stretching, if False HOLD MASTER read before
+				conversion end is NACKed (like NO HOLD)
+
+		Returns:
+			none
+		"""
+		self.humi = float(humi)
+		self.temp = float(temp)
+		self.sn = bytes(sn)
+		self.fw = int(fw)
+		self.latency = float(latency)
+		self.convScale = float(conv_scale)
+		self.nackRate = float(nack_rate)
+		self.crcErrorRate = float(crc_error_rate)
+		self.shortReadRate = float(short_read_rate)
+		self.rnd = random.Random(seed)
+		self.stretch = bool(stretch)
+		# counters
+		self.writes = 0
+		self.reads = 0
+		self.nacks = 0
+		self._reset()
+
+	def _reset(self):
+		self.user = 0x3A
+		self.heater = 0x00
+		self.busyUntil = 0.0 # chip don't ACK until this time (conversion / reset)
+		self.result = None # pending measurement result bytes
+		self.hold = False
+		self.out = b"" # data for next read
+		self.lastTemp = self._tempCode()
+
+	def _res(self):
+		return Si7021.SI7021_RES_BITS[((self.user&0x80)>>6) | (self.user&0x01)]
+
+	def _rhCode(self):
+		(rrh, rtp) = self._res()
+		code = int(round((self.humi + 6) * 65536 / 125))
+		code = max(0, min(0xFFFF, code))
+		# drop bits below resolution
+		return code & (0xFFFF << (16 - rrh)) & 0xFFFF
+
+	def _tempCode(self):
+		(rrh, rtp) = self._res()
+		code = int(round((self.temp + 46.85) * 65536 / 175.72))
+		code = max(0, min(0xFFFF, code))
+		return code & (0xFFFC << (14 - rtp)) & 0xFFFC
+
+	def _word(self, code, crc=True):
+		d = bytes(((code>>8)&0xFF, code&0xFF))
+		if not crc:
+			return d
+		c = crc8(d)
+		if (self.crcErrorRate > 0 and self.rnd.random() < self.crcErrorRate):
+			c ^= 0x01
+		return d + bytes((c,))
+
+	def _start(self, humi, hold):
+		(rrh, rtp) = self._res()
+		t = SIM_CONV_TIME_TEMP[rtp]
+		if humi:
+			t += SIM_CONV_TIME_HUMI[rrh]
+			self.lastTemp = self._tempCode()
+			self.result = self._word(self._rhCode())
+		else:
+			self.result = self._word(self._tempCode())
+		self.busyUntil = time.monotonic() + (t * self.convScale)
+		self.hold = hold
+		self.out = b""
+
+	def _nack(self, what):
+		self.nacks += 1
+		raise Si7021BusError("SimSi7021: NACK ({0})".format(what))
+
+	def _bus(self):
+		# common part of every message: latency, injected NACK, busy chip
+		if (self.latency > 0):
+			time.sleep(self.latency)
+		if (self.nackRate > 0 and self.rnd.random() < self.nackRate):
+			self._nack("injected")
+
+	def write(self, data):
+		"""Master writes one message."""
+		self._bus()
+		if (time.monotonic() < self.busyUntil):
+			self._nack("busy")
+		self.writes += 1
+		if not data:
+			return
+		cmd = data[0]
+		if (cmd == Si7021.SI7021_CMD_MEAS_HUMI_HOLD_MASTER):
+			self._start(True, True)
+		elif (cmd == Si7021.SI7021_CMD_MEAS_HUMI_NOHOLD_MASTER):
+			self._start(True, False)
+		elif (cmd == Si7021.SI7021_CMD_MEAS_TEMP_HOLD_MASTER):
+			self._start(False, True)
+		elif (cmd == Si7021.SI7021_CMD_MEAS_TEMP_NOHOLD_MASTER):
+			self._start(False, False)
+		elif (cmd == Si7021.SI7021_CMD_READ_TEMP_LAST_HUMI):
+			self.out = self._word(self.lastTemp, False)
+		elif (cmd == Si7021.SI7021_CMD_RESET):
+			self._reset()
+			self.busyUntil = time.monotonic() + (0.015 * self.convScale)
+		elif (cmd == Si7021.SI7021_CMD_WRITE_USER and len(data) > 1):
+			# only RES1, HTRE, RES0 are writable
+			self.user = (self.user & 0x7A) | (data[1] & 0x85)
+		elif (cmd == Si7021.SI7021_CMD_READ_USER):
+			self.out = bytes((self.user,))
+		elif (cmd == Si7021.SI7021_CMD_WRITE_HEATER and len(data) > 1):
+			self.heater = data[1] & 0x0F
+		elif (cmd == Si7021.SI7021_CMD_READ_HEATER):
+			self.out = bytes((self.heater,))
+		elif (cmd == Si7021.SI7021_CMD_READ_EID1_1 and data[1:2] == bytes((Si7021.SI7021_CMD_READ_EID1_2,))):
+			# SNA_3, CRC, SNA_2, CRC, ... CRC is cumulative
+			o = bytearray()
+			for i in range(4):
+				o += bytes((self.sn[i], crc8(self.sn[0:i+1])))
+			self.out = bytes(o)
+		elif (cmd == Si7021.SI7021_CMD_READ_EID2_1 and data[1:2] == bytes((Si7021.SI7021_CMD_READ_EID2_2,))):
+			# SNB_3, SNB_2, CRC, SNB_1, SNB_0, CRC
+			self.out = bytes((self.sn[4], self.sn[5], crc8(self.sn[4:6]), self.sn[6], self.sn[7], crc8(self.sn[4:8])))
+		elif (cmd == Si7021.SI7021_CMD_READ_FW_1 and data[1:2] == bytes((Si7021.SI7021_CMD_READ_FW_2,))):
+			self.out = bytes((self.fw,))
+		else:
+			self._nack("unknown command 0x{0:02X}".format(cmd))
+
+	def read(self, n):
+		"""Master reads one message of 'n' bytes."""
+		self._bus()
+		if self.result is not None:
+			wait = self.busyUntil - time.monotonic()
+			if (wait > 0):
+				if not (self.hold and self.stretch):
+					self._nack("converting")
+				# HOLD MASTER - clock stretching until conversion is done
+				time.sleep(wait)
+			self.out = self.result
+			self.result = None
+		elif (time.monotonic() < self.busyUntil):
+			self._nack("busy")
+		self.reads += 1
+		d = self.out[:n]
+		self.out = self.out[n:]
+		# after end of data chip sends 0xFF
+		d += b"\xFF" * (n - len(d))
+		if (self.shortReadRate > 0 and self.rnd.random() < self.shortReadRate):
+			d = d[:self.rnd.randrange(n)]
+		return d
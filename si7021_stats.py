@@ -0,0 +1,293 @@
+#!/usr/bin/python3
+
+# -*- coding: utf-8 -*-
+"""Streaming statistics of Si7021 samples
+
+Everything here is updated per sample in O(1) time and fixed memory, so long
+running sampling don't need to keep samples for later aggregation:
+	RunningStats - count, mean, variance (Welford), min, max
+	SlidingStats - the same over last N samples (ring + monotonic deques for min/max)
+	Ema - exponential moving average with time constant (irregular sampling is ok)
+	Si7021Aggregator - RH & temp. tumbling windows (e.g. per minute), sliding
+		window and EMA fed by raw samples; has write(ts, rh_code, temp_code, status)
+		so it can be used as Si7021.RawSink (i.e. fed by MeasRaw / Si7021Sampler)
+
+Example:
+	def emit(rec):
+		print(rec['start'], rec['humi']['mean'], rec['temp']['max'])
+	si.RawSink = Si7021Aggregator(60.0, emit)
+	with Si7021Sampler(si, 0.1):
+		...
+
+License:
+	MIT
+
+"""
+
+import math
+import threading
+from array import array
+from collections import deque
+from si7021 import Si7021
+from si7021_conv import rh_from_code, temp_from_code
+
+
+class RunningStats:
+	def __init__(self):
+		"""Initialize empty statistics.
+
+		Args:
+
+		Returns:
+			none
+		"""
+		self.Reset()
+
+	def Reset(self):
+		self.n = 0
+		self.mean = 0.0
+		self.m2 = 0.0
+		self.min = None
+		self.max = None
+
+	def add(self, x):
+		"""Add one value."""
+		self.n += 1
+		d = x - self.mean
+		self.mean += d / self.n
+		self.m2 += d * (x - self.mean)
+		if (self.min is None or x < self.min):
+			self.min = x
+		if (self.max is None or x > self.max):
+			self.max = x
+
+	def variance(self):
+		"""Sample variance (0 for less than 2 values)."""
+		if (self.n < 2):
+			return 0.0
+		return self.m2 / (self.n - 1)
+
+	def Result(self):
+		"""Return dict with fields n, mean, stddev, min, max (mean/min/max are None when empty)."""
+		return {
+			'n': self.n,
+			'mean': self.mean if self.n else None,
+			'stddev': math.sqrt(self.variance()),
+			'min': self.min,
+			'max': self.max
+			}
+
+
+class SlidingStats:
+	def __init__(self, size):
+		"""Initialize statistics over last 'size' values.
+
+		Args:
+			size(int): window length in samples
+
+		Returns:
+			none
+		"""
+		self.size = int(size)
+		self.vals = array('d', [0.0]) * self.size
+		self.Reset()
+
+	def Reset(self):
+		self.i = 0 # values added since reset
+		self.n = 0
+		self.mean = 0.0
+		self.m2 = 0.0
+		# (index, value) with decreasing values / increasing values
+		self.maxq = deque()
+		self.minq = deque()
+
+	def add(self, x):
+		"""Add one value, the oldest one falls out when window is full."""
+		i = self.i
+		slot = i % self.size
+		if (self.n == self.size):
+			# remove oldest value (Welford in reverse)
+			old = self.vals[slot]
+			self.n -= 1
+			if (self.n == 0):
+				(self.mean, self.m2) = (0.0, 0.0)
+			else:
+				d = old - self.mean
+				self.mean -= d / self.n
+				self.m2 = max(0.0, self.m2 - (d * (old - self.mean)))
+		self.vals[slot] = x
+		self.n += 1
+		d = x - self.mean
+		self.mean += d / self.n
+		self.m2 += d * (x - self.mean)
+		# monotonic deques, front is min/max of the window
+		q = self.maxq
+		while (q and q[-1][1] <= x):
+			q.pop()
+		q.append((i, x))
+		if (q[0][0] <= i - self.size):
+			q.popleft()
+		q = self.minq
+		while (q and q[-1][1] >= x):
+			q.pop()
+		q.append((i, x))
+		if (q[0][0] <= i - self.size):
+			q.popleft()
+		self.i = i + 1
+
+	def variance(self):
+		"""Sample variance of the window (0 for less than 2 values)."""
+		if (self.n < 2):
+			return 0.0
+		return self.m2 / (self.n - 1)
+
+	def Result(self):
+		"""Return dict with fields n, mean, stddev, min, max (mean/min/max are None when empty)."""
+		if (self.n == 0):
+			return { 'n': 0, 'mean': None, 'stddev': 0.0, 'min': None, 'max': None }
+		return {
+			'n': self.n,
+			'mean': self.mean,
+			'stddev': math.sqrt(self.variance()),
+			'min': self.minq[0][1],
+			'max': self.maxq[0][1]
+			}
+
+
+class Ema:
+	def __init__(self, tau):
+		"""Initialize exponential moving average.
+
+		Args:
+			tau(float): time constant in seconds (weight of sample is 1 - exp(-dt/tau))
+
+		Returns:
+			none
+		"""
+		self.tau = float(tau)
+		self.value = None
+		self.ts = None
+
+	def add(self, ts, x):
+		"""Add value 'x' measured at time 'ts', return new average."""
+		if self.value is None:
+			self.value = x
+		else:
+			dt = ts - self.ts
+			if (dt > 0):
+				self.value += (x - self.value) * (1.0 - math.exp(-dt / self.tau))
+		self.ts = ts
+		return self.value
+
+
+class Si7021Aggregator:
+	def __init__(self, window=60.0, emit=None, sliding=600, tau=60.0, sink=None):
+		"""Initialize aggregator of RH & temperature samples.
+		Samples with error status are only counted ('bad'), they don't get into statistics.
+
+		Args:
+			window(float): tumbling window length in seconds (windows are aligned to multiples of it)
+			emit: callable(record) called with aggregate of every finished window (from writer thread)
+			sliding(int): sliding window length in samples (0 = none)
+			tau(float): EMA time constant in seconds
+			sink: next RawSink (e.g. si7021_raw.RawWriter), every sample is passed to it
+
+		Returns:
+			none
+		"""
+		self.window = float(window)
+		self.emit = emit
+		self.sink = sink
+		self.lock = threading.Lock()
+		self.humi = RunningStats()
+		self.temp = RunningStats()
+		self.humiSliding = SlidingStats(sliding) if sliding else None
+		self.tempSliding = SlidingStats(sliding) if sliding else None
+		self.humiEma = Ema(tau)
+		self.tempEma = Ema(tau)
+		self.win = None # current window number
+		self.bad = 0 # error samples in current window
+		self.last = None # last emitted record
+
+	def _record(self):
+		start = self.win * self.window
+		re = {
+			'start': start,
+			'end': start + self.window,
+			'n': self.humi.n,
+			'bad': self.bad,
+			'humi': self.humi.Result(),
+			'temp': self.temp.Result()
+			}
+		re['humi']['ema'] = self.humiEma.value
+		re['temp']['ema'] = self.tempEma.value
+		return re
+
+	def _close(self):
+		# finish current window
+		rec = self._record()
+		self.last = rec
+		self.humi.Reset()
+		self.temp.Reset()
+		self.bad = 0
+		return rec
+
+	def write(self, ts, rh_code, temp_code, status):
+		"""Add one raw sample (Si7021.RawSink interface)."""
+		rec = None
+		with self.lock:
+			w = int(ts // self.window)
+			if (w != self.win):
+				if (self.win is not None and (self.humi.n or self.bad)):
+					rec = self._close()
+				self.win = w
+			if (status == Si7021.SI7021_STATUS_OK):
+				h = rh_from_code(rh_code)
+				t = temp_from_code(temp_code)
+				self.humi.add(h)
+				self.temp.add(t)
+				if self.humiSliding is not None:
+					self.humiSliding.add(h)
+					self.tempSliding.add(t)
+				self.humiEma.add(ts, h)
+				self.tempEma.add(ts, t)
+			else:
+				self.bad += 1
+		if (rec is not None and self.emit is not None):
+			self.emit(rec)
+		if self.sink is not None:
+			self.sink.write(ts, rh_code, temp_code, status)
+
+	def flush(self):
+		"""Finish current window now (emit it) and flush next sink."""
+		rec = None
+		with self.lock:
+			if (self.win is not None and (self.humi.n or self.bad)):
+				rec = self._close()
+		if (rec is not None and self.emit is not None):
+			self.emit(rec)
+		if self.sink is not None:
+			self.sink.flush()
+
+	def close(self):
+		self.flush()
+		if self.sink is not None:
+			self.sink.close()
+
+	def Current(self):
+		"""Return statistics of running window, sliding window and EMA without waiting for window end.
+
+		Args:
+
+		Returns:
+			dict - same as emitted record (None if nothing was added yet) with extra fields
+			'humi_sliding', 'temp_sliding' (SlidingStats.Result() dicts) when sliding window is used
+		"""
+		with self.lock:
+			if self.win is None:
+				return None
+			re = self._record()
+			if self.humiSliding is not None:
+				re['humi_sliding'] = self.humiSliding.Result()
+				re['temp_sliding'] = self.tempSliding.Result()
+			return re
@@ -14,18 +14,8 @@ SI7021_RES_RH11_TEMP11=0x03
 
 #bus.write_byte_data(SI7021_ADDR, 0xFA, 0x0F);
 #dta = bus.read_block_data(SI7021_ADDR, 0x0FFA)
-# crc8 calc by hippy@forum.raspberrypi.org - THX
-def crc8_update(b, crc):
-	for i in range(8):
-		if ( ((b^crc) & 0x80) == 0x80 ):
-			crc = crc<<1
-			crc = crc^0x31
-		else:
-			crc = crc<<1
-		b = b << 1
-	
-	crc = crc & 0xFF
-	return crc
+# crc8 calc by hippy@forum.raspberrypi.org - THX (table version lives in si7021.py now)
+from si7021 import crc8_update
 
 
 def byte_array_to_string(ar):